@@ -51,6 +51,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "api.middleware.ResponseCompressionMiddleware",
+    "api.middleware.RequestDecompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -123,21 +125,120 @@ CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',  # Use Redis for production
         'LOCATION': 'unique-snowflake',
-    }
+    },
+    # State every worker process and host must agree on: event dedup, micro-batches, token revocation.
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get("REDIS_CACHE_URL", "redis://localhost:6379/1"),
+    },
 }
 
 CELERY_BROKER_URL = "redis://localhost:6379/0"  # Use Redis as the message broker
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 
+INGEST_BATCH_MAX_SIZE = 1000  # Max events accepted by /server/incoming_data/batch/
+INGEST_ENQUEUE_CHUNK_SIZE = 100  # Events carried by one broker message
+INGEST_NDJSON_MAX_LINE_BYTES = 1024 * 1024  # Longest accepted line on /server/incoming_data/stream/
+INGEST_NDJSON_MAX_ERRORS = 100  # Invalid lines echoed back in the stream response
+INGEST_DECOMPRESS_PATHS = ["/server/incoming_data/"]  # Path prefixes accepting gzip/zstd/br request bodies
+INGEST_MAX_DECOMPRESSED_BYTES = 50 * 1024 * 1024  # Decoded body size at which a compressed upload is refused (413)
+INGEST_DECOMPRESS_CHUNK_SIZE = 64 * 1024  # Bytes read and decoded per step
+
+ACCOUNT_TOKEN_CACHE_SIZE = 10000  # In-process CL-X-TOKEN -> account entries per worker
+ACCOUNT_TOKEN_CACHE_TTL = 300  # Seconds a resolved token stays cached (account changes are seen at once via its generation)
+ACCOUNT_TOKEN_NEGATIVE_TTL = 30  # Seconds an unknown token stays cached
+AUTH_TOKEN_CACHE_SIZE = 10000  # API tokens whose user is kept in memory per process
+AUTH_TOKEN_CACHE_TTL = 60  # Seconds before a cached token is looked up again (revocation is seen at once via the user's generation)
+
+GENERATION_CACHE_ALIAS = "shared"  # Must be a shared cache (Redis): a bump must reach every process, e.g. on token revocation
+
+DEDUP_CACHE_ALIAS = "shared"  # Must be a shared cache (Redis): ids are claimed across workers and hosts
+DEDUP_RETENTION_SECONDS = 24 * 60 * 60  # How long a received event id is remembered
+
+MICRO_BATCH_CACHE_ALIAS = "shared"  # Must be a shared cache (Redis): open batches are filled by every worker
+MICRO_BATCH_MAX_COLLECT_PASSES = 5  # Flush passes that wait for a claimed slot's event before the batch goes without it
+
+DELIVERY_MAX_CONCURRENCY = 10  # Destinations of one event delivered in parallel per task
+DELIVERY_POOL_SIZE = 10  # Keep-alive connections kept per destination host
+DELIVERY_POOL_IDLE_TIMEOUT = 90  # Seconds before an unused host session is closed
+DELIVERY_POOL_MAX_HOSTS = 256  # Host sessions kept per worker process
+DELIVERY_CONNECT_TIMEOUT = 3.05  # Seconds to establish a connection to a destination
+DELIVERY_READ_TIMEOUT = 10  # Seconds to wait for a destination to respond
+DELIVERY_MAX_ATTEMPTS = 5  # Attempts per (event, destination) including the first
+DELIVERY_RETRY_BASE_DELAY = 5  # Seconds; backoff doubles per attempt, with full jitter
+DELIVERY_RETRY_MAX_DELAY = 3600  # Upper bound for backoff and Retry-After delays
+
+CIRCUIT_CACHE_ALIAS = "shared"  # Must be a shared cache (Redis): every worker trips and reads the same breaker
+CIRCUIT_WINDOW_SECONDS = 60  # Rolling window a destination's error rate is measured over
+CIRCUIT_BUCKET_SECONDS = 10  # Granularity of that window
+CIRCUIT_MIN_CALLS = 20  # Calls needed in the window before the breaker may open
+CIRCUIT_ERROR_RATE = 0.5  # Failure ratio that opens the breaker
+CIRCUIT_SLOW_CALL_SECONDS = 5  # Calls slower than this count as failures
+CIRCUIT_COOLDOWN_SECONDS = 30  # Time open before a half-open probe is let through
+# Redis redelivers a message that is not acked within the visibility timeout, and a retry's
+# countdown counts against it: keep it well above the longest countdown (max delay + cooldown).
+CELERY_BROKER_TRANSPORT_OPTIONS = {"visibility_timeout": 2 * (DELIVERY_RETRY_MAX_DELAY + CIRCUIT_COOLDOWN_SECONDS)}
+
+RESPONSE_CACHE_TIMEOUT = 300  # Seconds rendered list responses stay cached (dropped early on writes)
+RESPONSE_COMPRESSION_PATHS = ["/accounts/", "/account_members/", "/destinations/", "/logs/", "/users/"]  # Lists and exports compressed on request
+RESPONSE_COMPRESSION_MIN_BYTES = 1024  # Smaller bodies are not worth compressing
+ACCESS_SCOPE_CACHE_TIMEOUT = 300  # Seconds a user's roles and account memberships stay cached (dropped early on changes)
+
+LOG_WRITER_MAX_BUFFER = 1000  # Delivery logs buffered per worker before a forced flush
+LOG_WRITER_FLUSH_INTERVAL = 0  # Seconds logs may wait to share a flush; 0 flushes after every task
+
+FAST_READ_PATH = True  # Serve list endpoints from .values() rows instead of model instances and serializers
+LIST_PAGE_SIZE = 100  # Rows per page of account, member, destination and user lists when ?page= is given
+LIST_MAX_PAGE_SIZE = 1000  # Upper bound for their ?page_size= query parameter
+
+LOG_PAGE_SIZE = 100  # Logs per page of the /logs/ cursor pagination
+LOG_MAX_PAGE_SIZE = 1000  # Upper bound for the ?page_size= query parameter
+LOG_RESPONSE_CACHE_TIMEOUT = 5  # Seconds a rendered /logs/ page is served from the cache
+LOG_EXPORT_CHUNK_SIZE = 2000  # Rows fetched per database round trip by /logs/export/
+
+LOG_RETENTION_DAYS = 30  # Default age at which logs are purged; Account.log_retention_days overrides it
+LOG_PURGE_INTERVAL = 60 * 60  # Seconds between runs of the expired log purge
+LOG_PURGE_CHUNK_SIZE = 1000  # Ids covered by one DELETE of the purge
+LOG_PURGE_CHUNK_PAUSE = 0.05  # Seconds slept between two purge chunks
+
+LOG_ARCHIVE_DIR = Path(os.environ.get("LOG_ARCHIVE_DIR", BASE_DIR / "log_archive"))  # Must be shared storage (e.g. an NFS mount): any worker archives, every web host reads
+LOG_ARCHIVE_CACHE_ALIAS = "shared"  # Must be a shared cache (Redis): one archiver per account across hosts
+LOG_ARCHIVE_AFTER_DAYS = 7  # Logs older than this move from the database to the archive
+LOG_ARCHIVE_BLOCK_ROWS = 1000  # Rows per compressed block of a segment
+LOG_ARCHIVE_INTERVAL = 60 * 60  # Seconds between runs of the archiver
+
+DELIVERY_STATS_MINUTE_RETENTION_DAYS = 7  # Minute rollups are kept this long; hourly ones follow log retention
+DELIVERY_STATS_DEFAULT_WINDOW_HOURS = 24  # Range the stats endpoints cover when ?since= is not given
+
+CELERY_BEAT_SCHEDULE = {
+    "purge-expired-logs": {
+        "task": "api.tasks.purge_expired_logs",
+        "schedule": LOG_PURGE_INTERVAL,
+    },
+    "archive-old-logs": {
+        "task": "api.tasks.archive_old_logs",
+        "schedule": LOG_ARCHIVE_INTERVAL,
+    },
+}
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",       
+        "Users.authentication.CachedTokenAuthentication",
         ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated", 
         'Users.permissions.AllowFirstUserWithoutAuth',
     ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.parsers.FastJSONParser",  # orjson-backed, falls back to the stdlib
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
     'DEFAULT_SCHEMA_CLASS' : 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_THROTTLE_CLASSES': [
         'api.throttling.AuthenticatedUserThrottle',  # Add custom throttle here
@@ -1,4 +1,14 @@
+import copy
+from django.conf import settings
 from rest_framework.authentication import TokenAuthentication
+from api.generations import get_generations, user_scope
+from api.local_cache import LocalTTLCache
+
+auth_token_cache = LocalTTLCache(
+    maxsize=getattr(settings, "AUTH_TOKEN_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "AUTH_TOKEN_CACHE_TTL", 60),
+)
+
 
 class CustomTokenAuthentication(TokenAuthentication):
     def authenticate(self, request):
@@ -9,3 +19,39 @@ class CustomTokenAuthentication(TokenAuthentication):
             if request.method == "POST" and request.path == "/logout/":
                 token.delete()
         return auth
+
+
+class CachedTokenAuthentication(CustomTokenAuthentication):
+    """
+    Token authentication that keeps ``token key -> (user, token)`` in a
+    bounded in-process TTL cache, so a known token costs no query.
+
+    Only successful lookups are cached, together with the user's generation
+    from ``api.generations``. That generation lives in the shared cache and
+    is bumped when the token is deleted and when its user is saved or
+    deleted, so every hit is checked against it and a revoked token stops
+    working at once on every process. Each request gets its own copies of
+    the cached instances.
+    """
+
+    def authenticate_credentials(self, key):
+        cached = auth_token_cache.get(key)
+        if cached is not None and cached[2] != _user_generation(cached[0].pk):
+            cached = None
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            cached = (user, token, _user_generation(user.pk))
+            auth_token_cache.set(key, cached)
+        user, token = copy.copy(cached[0]), copy.copy(cached[1])
+        token.user = user
+        return user, token
+
+
+def _user_generation(user_id):
+    scope = user_scope(user_id)
+    return get_generations([scope])[scope]
+
+
+def invalidate_auth_token(key):
+    """Drop a token from this process's cache; other processes see the user's generation bump."""
+    auth_token_cache.delete(key)
@@ -4,7 +4,6 @@ from .models import User
 from .serializers import UserSerializer
 from rest_framework.permissions import IsAuthenticated,IsAdminUser
 from rest_framework.exceptions import PermissionDenied
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.authtoken.models import Token
@@ -18,8 +17,12 @@ from rest_framework.decorators import(
 from rest_framework.permissions import AllowAny
 from django.contrib.auth import authenticate
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample,  OpenApiTypes
-from rest_framework.parsers import JSONParser, FormParser, MultiPartParser
+from rest_framework.parsers import FormParser, MultiPartParser
+from api.parsers import FastJSONParser
 from .permissions import AllowFirstUserWithoutAuth
+from .authentication import CachedTokenAuthentication
+from api.fieldsets import SparseFieldsetMixin
+from api.pagination import OptionalPageNumberPagination
 from django.contrib.auth import get_user_model
 
 
@@ -59,7 +62,7 @@ User = get_user_model()
     responses={200: {"type": "object", "properties": {"token": {"type": "string"}}}},
 )
 @api_view(['POST'])
-@parser_classes([JSONParser,FormParser, MultiPartParser])  # ✅ Supports form-data
+@parser_classes([FastJSONParser,FormParser, MultiPartParser])  # ✅ Supports form-data
 @permission_classes([AllowAny])
 def obtain_auth_token_form(request):
     """
@@ -81,15 +84,16 @@ def obtain_auth_token_form(request):
     return Response({"error": "Invalid credentials"}, status=401)
 
 
-class UserListView(viewsets.ModelViewSet):
+class UserListView(SparseFieldsetMixin, viewsets.ModelViewSet):
     serializer_class = UserSerializer
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [AllowFirstUserWithoutAuth]
-    parser_classes =(MultiPartParser, FormParser, JSONParser)
+    parser_classes =(MultiPartParser, FormParser, FastJSONParser)
+    pagination_class = OptionalPageNumberPagination
 
     def get_queryset(self):
         if self.request.user.is_superuser:
-            return User.objects.all()
+            return User.objects.order_by("id")
         return User.objects.filter(id=self.request.user.id)
     
     def get_serializer_context(self):
@@ -140,10 +144,12 @@ class UserListView(viewsets.ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
 class LogoutView(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [AllowFirstUserWithoutAuth]
 
     @extend_schema(exclude=True)
     def post(self, request):
-        request.auth.delete()
+        if request.auth is not None:
+            # The token may already be gone when another request logged out first.
+            Token.objects.filter(key=request.auth.key).delete()
         return Response({"message": "Successfully logged out"}, status=200)
\ No newline at end of file
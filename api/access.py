@@ -0,0 +1,69 @@
+from collections import namedtuple
+from django.conf import settings
+from django.core.cache import cache
+from api.generations import get_generations, user_scope
+from api.models import AccountMember
+
+ADMIN_ROLE_ID = 1
+NORMAL_USER_ROLE_ID = 2
+
+
+class AccessScope(namedtuple("AccessScope", ["user_id", "is_superuser", "is_admin", "roles"])):
+    """
+    What one user may see: superuser and Admin flags, and their role id in
+    each account they belong to (``roles`` maps account id to role id).
+    """
+    __slots__ = ()
+
+    @property
+    def sees_all_accounts(self):
+        return self.is_superuser or self.is_admin
+
+    @property
+    def account_ids(self):
+        return frozenset(self.roles)
+
+    def is_member(self, account_id):
+        return int(account_id) in self.roles
+
+    def has_role(self, account_id, role_id):
+        return self.roles.get(int(account_id)) == role_id
+
+    def scope(self, queryset, field="account_id"):
+        """``queryset`` restricted to the user's accounts, unless they see all of them."""
+        if self.sees_all_accounts:
+            return queryset
+        return queryset.filter(**{f"{field}__in": self.account_ids})
+
+
+def resolve_access_scope(user):
+    memberships = AccountMember.objects.filter(user=user).values_list("account_id", "role_id", "role__role_name")
+    roles = {}
+    is_admin = False
+    for account_id, role_id, role_name in memberships:
+        roles[account_id] = role_id
+        is_admin = is_admin or role_id == ADMIN_ROLE_ID or role_name == "Admin"
+    return AccessScope(user.id, user.is_superuser, is_admin, roles)
+
+
+def get_access_scope(request):
+    """
+    The ``AccessScope`` of the request's user. It is resolved once per
+    request and cached across requests under the user's generation, which
+    the ``AccountMember`` and ``User`` signals bump on every change.
+    """
+    scope = getattr(request, "_access_scope", None)
+    if scope is None:
+        scope = get_user_access_scope(request.user)
+        request._access_scope = scope
+    return scope
+
+
+def get_user_access_scope(user):
+    generation = get_generations([user_scope(user.id)])[user_scope(user.id)]
+    key = f"access_scope_{user.id}_{generation}"
+    scope = cache.get(key)
+    if scope is None:
+        scope = resolve_access_scope(user)
+        cache.set(key, scope, timeout=getattr(settings, "ACCESS_SCOPE_CACHE_TIMEOUT", 300))
+    return scope
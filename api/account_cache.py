@@ -0,0 +1,53 @@
+from collections import namedtuple
+from django.conf import settings
+from .generations import account_scope, get_generations
+from .local_cache import LocalTTLCache
+from .models import Account
+
+AccountRecord = namedtuple("AccountRecord", ["id", "account_id", "account_name"])
+
+_UNKNOWN = object()
+
+token_cache = LocalTTLCache(
+    maxsize=getattr(settings, "ACCOUNT_TOKEN_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "ACCOUNT_TOKEN_CACHE_TTL", 300),
+)
+
+
+def get_account_by_token(app_secret_token):
+    """
+    Resolve an app secret token to an ``AccountRecord``, or ``None`` when
+    no account owns it. Both outcomes are cached in-process; unknown
+    tokens are kept for ``ACCOUNT_TOKEN_NEGATIVE_TTL`` seconds only. A
+    cached record is only used while its account's generation, which lives
+    in the shared cache and is bumped whenever the account is saved or
+    deleted, is unchanged, so every process stops accepting a deleted
+    account's token at once.
+    """
+    cached = token_cache.get(app_secret_token)
+    if cached is _UNKNOWN:
+        return None
+    if cached is not None:
+        record, generation = cached
+        if _account_generation(record.id) == generation:
+            return record
+
+    account = (Account.objects.filter(app_secret_token=app_secret_token)
+               .values_list("id", "account_id", "account_name").first())
+    if account is None:
+        token_cache.set(app_secret_token, _UNKNOWN,
+                        ttl=getattr(settings, "ACCOUNT_TOKEN_NEGATIVE_TTL", 30))
+        return None
+    record = AccountRecord(*account)
+    token_cache.set(app_secret_token, (record, _account_generation(record.id)))
+    return record
+
+
+def _account_generation(account_id):
+    scope = account_scope(account_id)
+    return get_generations([scope])[scope]
+
+
+def invalidate_account_token(app_secret_token):
+    """Drop a token from this process's cache; other processes see the account's generation bump."""
+    token_cache.delete(app_secret_token)
@@ -0,0 +1,348 @@
+import base64
+import heapq
+import json
+import mmap
+import os
+import shutil
+import zlib
+from datetime import timedelta
+from itertools import islice
+from pathlib import Path
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import now
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from api.access import get_access_scope
+from api.dedup import BloomFilter
+from api.export import EXPORT_FIELDS, encode_json
+from api.models import Log
+from api.retention import delete_in_chunks, unreferenced_events
+
+BLOOM_ERROR_RATE = 0.01
+
+
+def _bloom_for(event_ids):
+    bloom = BloomFilter(max(1, len(event_ids)), BLOOM_ERROR_RATE)
+    for event_id in event_ids:
+        bloom.add(event_id)
+    return bloom
+
+
+def row_key(row):
+    """
+    ``(received_timestamp, id)`` of an archived row, the archive's sort key.
+    Timestamps are archived with their microseconds, so the key is exact.
+    """
+    return parse_datetime(row["received_timestamp"]), row["id"]
+
+
+def _load_bloom(entry):
+    bloom = BloomFilter(max(1, entry["rows"]), BLOOM_ERROR_RATE)
+    bloom.bits = bytearray(base64.b64decode(entry["bloom"]))
+    return bloom
+
+
+class LogArchive:
+    """
+    Append-only, compressed log segments on disk, one per account per day.
+
+    ``<root>/<account id>/<YYYY-MM-DD>.seg`` holds zlib-compressed blocks
+    of NDJSON rows in the ``/logs/`` format, written in
+    ``(received_timestamp, id)`` order. Next to it, ``.idx`` is a sparse
+    index with one JSON line per block: its byte range, first and last
+    timestamps, and a Bloom filter of its event ids. Readers memory-map the
+    segment and decompress only the blocks the index says can match.
+
+    A block is written and synced before its index line, so a crash leaves
+    at worst unindexed bytes that readers never look at. Each index line
+    also records the ``(received_timestamp, id)`` keys of its first and
+    last rows, so the archiver can tell which rows are already written.
+
+    ``root`` must be storage shared by every host (``LOG_ARCHIVE_DIR``):
+    the archiver may run on any worker and the API reads the segments.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def _paths(self, account_id, day):
+        base = self.root / str(account_id) / day
+        return base.with_suffix(".seg"), base.with_suffix(".idx")
+
+    def days(self, account_id):
+        folder = self.root / str(account_id)
+        if not folder.is_dir():
+            return []
+        return sorted(path.stem for path in folder.glob("*.idx"))
+
+    def account_ids(self):
+        """Ids of the accounts that have an archive folder."""
+        if not self.root.is_dir():
+            return []
+        return sorted(int(path.name) for path in self.root.iterdir() if path.is_dir() and path.name.isdigit())
+
+    def append_block(self, account_id, day, rows):
+        """Append ``rows`` (dicts in export format) as one block of a day's segment."""
+        segment, index = self._paths(account_id, day)
+        segment.parent.mkdir(parents=True, exist_ok=True)
+        payload = zlib.compress("".join(encode_json(row) + "\n" for row in rows).encode())
+        with open(segment, "ab") as handle:
+            offset = handle.tell()
+            handle.write(payload)
+            handle.flush()
+            os.fsync(handle.fileno())
+        entry = {
+            "offset": offset,
+            "length": len(payload),
+            "rows": len(rows),
+            "first": rows[0]["received_timestamp"],
+            "last": rows[-1]["received_timestamp"],
+            "bloom": base64.b64encode(_bloom_for([row["event_id"] for row in rows]).bits).decode(),
+            "keys": [[timestamp.isoformat(), pk] for timestamp, pk in (row_key(rows[0]), row_key(rows[-1]))],
+        }
+        with open(index, "a") as handle:
+            handle.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            handle.flush()
+            os.fsync(handle.fileno())
+        return entry
+
+    def read_index(self, account_id, day):
+        _, index = self._paths(account_id, day)
+        with open(index) as handle:
+            return [json.loads(line) for line in handle if line.strip()]
+
+    def last_block_keys(self, account_id):
+        """Exact first and last ``(received_timestamp, id)`` of the newest block, or ``None``."""
+        for day in reversed(self.days(account_id)):
+            entries = self.read_index(account_id, day)
+            if entries:
+                keys = entries[-1].get("keys")
+                return [(parse_datetime(timestamp), pk) for timestamp, pk in keys] if keys else None
+        return None
+
+    def iter_rows(self, account_id, since=None, until=None, event_id=None, after=None, reverse=False,
+                  **filters):
+        """
+        Yield archived rows of an account in ``(received_timestamp, id)``
+        order, newest first when ``reverse``, limited to ``since <=
+        received_timestamp < until`` and, when given, to one ``event_id``,
+        to rows past the ``after`` key in that order and to rows whose
+        other columns equal ``filters``.
+        """
+        if after is not None and reverse:
+            bound = after[0] + timedelta(microseconds=1)
+            until = min(until, bound) if until else bound
+        elif after is not None:
+            since = max(since, after[0]) if since else after[0]
+        for row in self._iter_rows(account_id, since, until, event_id, reverse):
+            if after is not None and (row_key(row) >= after if reverse else row_key(row) <= after):
+                continue
+            if all(str(row[column]) == str(value) for column, value in filters.items()):
+                yield row
+
+    def _iter_rows(self, account_id, since, until, event_id, reverse):
+        first_day = since.date().isoformat() if since else None
+        last_day = until.date().isoformat() if until else None
+        days = self.days(account_id)
+        for day in reversed(days) if reverse else days:
+            if (first_day and day < first_day) or (last_day and day > last_day):
+                continue
+            blocks = []
+            for entry in self.read_index(account_id, day):
+                if since and parse_datetime(entry["last"]) < since:
+                    continue
+                if until and parse_datetime(entry["first"]) >= until:
+                    continue
+                if event_id is not None and event_id not in _load_bloom(entry):
+                    continue
+                blocks.append(entry)
+            if blocks:
+                yield from self._read_blocks(account_id, day, blocks, since, until, event_id, reverse)
+
+    def _read_blocks(self, account_id, day, blocks, since, until, event_id, reverse):
+        segment, _ = self._paths(account_id, day)
+        seen = set()  # A block re-written after a crash must not show twice
+        with open(segment, "rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            for entry in reversed(blocks) if reverse else blocks:
+                data = zlib.decompress(view[entry["offset"]:entry["offset"] + entry["length"]])
+                lines = data.splitlines()
+                for line in reversed(lines) if reverse else lines:
+                    row = json.loads(line)
+                    if row["id"] in seen:
+                        continue
+                    seen.add(row["id"])
+                    if event_id is not None and row["event_id"] != event_id:
+                        continue
+                    received = row_key(row)[0]
+                    if (since and received < since) or (until and received >= until):
+                        continue
+                    yield row
+
+    def iter_accounts(self, account_ids, **options):
+        """``iter_rows`` of several accounts merged into one sequence in the same order."""
+        streams = [self.iter_rows(account_id, **options) for account_id in account_ids]
+        return heapq.merge(*streams, key=row_key, reverse=options.get("reverse", False))
+
+    def drop_account(self, account_id):
+        """Delete every segment of an account."""
+        shutil.rmtree(self.root / str(account_id), ignore_errors=True)
+
+    def drop_days_before(self, account_id, day):
+        """Delete the segments of days older than ``day``; returns how many were dropped."""
+        dropped = 0
+        for old_day in self.days(account_id):
+            if old_day < day:
+                for path in self._paths(account_id, old_day):
+                    path.unlink(missing_ok=True)
+                dropped += 1
+        return dropped
+
+
+def encode_cursor(row):
+    """Opaque position just after ``row`` for ``LogArchive.iter_rows(after=...)``."""
+    timestamp, pk = row_key(row)
+    raw = json.dumps([timestamp.isoformat(), pk], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """``(timestamp, id)`` of a cursor; raises ``ValueError`` when it is malformed."""
+    try:
+        timestamp, pk = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        timestamp = parse_datetime(timestamp)
+    except (TypeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if timestamp is None or not isinstance(pk, int):
+        raise ValueError("Invalid cursor")
+    return timestamp, pk
+
+
+log_archive = LogArchive(getattr(settings, "LOG_ARCHIVE_DIR", settings.BASE_DIR / "log_archive"))
+
+
+def archive_cutoff(at=None):
+    """Logs received before this moment leave the database for the archive."""
+    return (at or now()) - timedelta(days=getattr(settings, "LOG_ARCHIVE_AFTER_DAYS", 7))
+
+
+def _key_range(first, last):
+    """Logs whose ``(received_timestamp, id)`` lies between ``first`` and ``last``, inclusive."""
+    (first_time, first_id), (last_time, last_id) = first, last
+    return ((Q(received_timestamp__gt=first_time) | Q(received_timestamp=first_time, id__gte=first_id))
+            & (Q(received_timestamp__lt=last_time) | Q(received_timestamp=last_time, id__lte=last_id)))
+
+
+def archive_account_logs(account, at=None, archive=None):
+    """
+    Move the logs of ``account`` older than the hot window into the archive,
+    oldest first, one block at a time; each block's rows are deleted from
+    the database once the block is on disk. Rows of a block that was
+    written just before a crash are deleted without being written again.
+    Returns the rows archived.
+    """
+    archive = archive or log_archive
+    store = caches[getattr(settings, "LOG_ARCHIVE_CACHE_ALIAS", "shared")]
+    lock = f"archive_lock_{account.id}"
+    if not store.add(lock, 1, timeout=60 * 60):
+        return 0
+    try:
+        cutoff = archive_cutoff(at)
+        last_block = archive.last_block_keys(account.id)
+        if last_block is not None:
+            delete_in_chunks(Log.objects.filter(_key_range(*last_block), account_id=account.id))
+        block_rows = getattr(settings, "LOG_ARCHIVE_BLOCK_ROWS", 1000)
+        pending = (Log.objects.filter(account_id=account.id, received_timestamp__lt=cutoff)
+                   .order_by("received_timestamp", "id")
+                   .values_list(*EXPORT_FIELDS.values()))
+        archived = 0
+        while True:
+            # Archived rows are deleted, so each read starts at the oldest remaining row.
+            batch = [dict(zip(EXPORT_FIELDS, values)) for values in pending[:block_rows]]
+            if not batch:
+                break
+            day = batch[0]["received_timestamp"].date()
+            block = [row for row in batch if row["received_timestamp"].date() == day]
+            archive.append_block(account.id, day.isoformat(), json.loads(encode_json(block)))
+            Log.objects.filter(id__in=[row["id"] for row in block]).delete()
+            archived += len(block)
+        delete_in_chunks(unreferenced_events(account_id=account.id, received_timestamp__lt=cutoff))
+        return archived
+    finally:
+        store.delete(lock)
+
+
+class ArchiveFallthroughMixin:
+    """
+    Continues ``list`` and ``export`` into the archive once the database
+    rows run out, so clients page through one sequence whichever store
+    holds a log. Archived rows follow the database rows, newest first.
+
+    The archive is only consulted for the default ordering and the filters
+    it can evaluate: ``account``, ``destination``, ``status`` and
+    ``search`` on the event id; other queries only see the database.
+    Pages read from the archive are linked with ``?archive_cursor=`` and
+    carry no ``previous`` link.
+    """
+    archive_cursor_query_param = "archive_cursor"
+    archive_start = "start"
+    archive_filters = ["destination", "status"]
+
+    def get_archived_rows(self, after=None):
+        """Archived rows matching the request after ``after``, or ``None`` when the archive does not apply."""
+        params = self.request.query_params
+        if params.get("ordering", "-received_timestamp") != "-received_timestamp":
+            return None
+        if any(params.get(name) for name in ["received_timestamp", "processed_timestamp"]):
+            return None
+        access = get_access_scope(self.request)
+        account_ids = log_archive.account_ids() if access.is_admin else sorted(access.account_ids)
+        if params.get("account"):
+            account_ids = [account_id for account_id in account_ids if str(account_id) == params["account"]]
+        filters = {name: params[name] for name in self.archive_filters if params.get(name)}
+        rows = log_archive.iter_accounts(account_ids, after=after, reverse=True, **filters)
+        terms = params.get("search", "").replace(",", " ").lower().split()
+        if terms:
+            rows = (row for row in rows if all(term in row["event_id"].lower() for term in terms))
+        return rows
+
+    def get_archive_link(self, cursor):
+        url = remove_query_param(self.request.build_absolute_uri(), self.paginator.cursor_query_param)
+        return replace_query_param(url, self.archive_cursor_query_param, cursor)
+
+    def list(self, request, *args, **kwargs):
+        encoded = request.query_params.get(self.archive_cursor_query_param)
+        if encoded:
+            return self.list_archived(encoded)
+        response = super().list(request, *args, **kwargs)
+        data = response.data
+        if response.status_code != 200 or not isinstance(data, dict) or data.get("next") is not None:
+            return response
+        rows = self.get_archived_rows()
+        if rows is None:
+            return response
+        room = self.paginator.get_page_size(request) - len(data["results"])
+        archived = list(islice(rows, room + 1))
+        data["results"] = list(data["results"]) + archived[:room]
+        if len(archived) > room:
+            data["next"] = self.get_archive_link(encode_cursor(archived[room - 1]) if room else self.archive_start)
+        return response
+
+    def list_archived(self, encoded):
+        try:
+            after = None if encoded == self.archive_start else decode_cursor(encoded)
+        except ValueError:
+            raise NotFound(self.paginator.invalid_cursor_message)
+        rows = self.get_archived_rows(after)
+        if rows is None:
+            raise NotFound(self.paginator.invalid_cursor_message)
+        page_size = self.paginator.get_page_size(self.request)
+        results = list(islice(rows, page_size + 1))
+        next_link = None
+        if len(results) > page_size:
+            results = results[:page_size]
+            next_link = self.get_archive_link(encode_cursor(results[-1]))
+        return Response({"next": next_link, "previous": None, "results": results})
@@ -0,0 +1,105 @@
+import time
+from django.conf import settings
+from django.core.cache import caches
+
+ITEM_TIMEOUT = 3600
+
+# Written by a flusher into a slot whose item never arrived.
+ABANDONED = "abandoned"
+
+
+class MicroBatcher:
+    """
+    Collects the events headed to one batch-enabled ``Destination`` into
+    shared micro-batches of up to ``max_events`` items.
+
+    Batches live in the shared cache (``MICRO_BATCH_CACHE_ALIAS``), so
+    every worker appends to the same open batch. An event first claims a slot with an atomic increment of
+    the batch's counter and then stores its item under that slot. Slot 1
+    starts the batch's timer and slot ``max_events`` fills it; either way a
+    single flusher wins ``close``, which pushes the counter past
+    ``max_events`` so later events roll over into the next batch. A slot
+    whose item is still missing after the flusher gave up is ``abandon``-ed,
+    and the item written late is refused.
+    """
+
+    def __init__(self, destination_id, max_events, max_wait_ms, cache_alias=None):
+        self.destination_id = destination_id
+        self.max_events = max_events
+        self.max_wait_ms = max_wait_ms
+        self.cache_alias = cache_alias or getattr(settings, "MICRO_BATCH_CACHE_ALIAS", "shared")
+
+    @property
+    def store(self):
+        return caches[self.cache_alias]
+
+    def _key(self, *parts):
+        return "_".join(["mbatch", str(self.destination_id), *map(str, parts)])
+
+    def _incr(self, key, delta=1):
+        self.store.add(key, 0, timeout=ITEM_TIMEOUT)
+        return self.store.incr(key, delta)
+
+    def current_sequence(self):
+        self.store.add(self._key("current"), 0, timeout=None)
+        return self.store.get(self._key("current"), 0)
+
+    def add(self, item):
+        """
+        Append ``item`` and return ``(sequence, slot)``. The caller starts
+        the flush timer when ``slot == 1`` and flushes at once when
+        ``slot == max_events``. ``slot`` is ``None`` when the batch was
+        flushed without the item because it was written too late.
+        """
+        while True:
+            sequence = self.current_sequence()
+            slot = self._incr(self._key(sequence, "n"))
+            if slot <= self.max_events:
+                if not self.store.add(self._key(sequence, slot), item, timeout=ITEM_TIMEOUT):
+                    return sequence, None
+                return sequence, slot
+            # The batch is full or already flushing; one worker moves the others on.
+            if self.store.add(self._key(sequence, "advanced"), 1, timeout=ITEM_TIMEOUT):
+                self._incr(self._key("current"))
+
+    def close(self, sequence):
+        """
+        Close the batch for new events. Returns the claimed slot numbers,
+        or ``None`` when another flusher already closed it.
+        """
+        if not self.store.add(self._key(sequence, "flush"), 1, timeout=ITEM_TIMEOUT):
+            return None
+        final = self._incr(self._key(sequence, "n"), self.max_events + 1)
+        claimed = min(final - (self.max_events + 1), self.max_events)
+        return list(range(1, claimed + 1))
+
+    def collect(self, sequence, slots, attempts=5, pause=0.02):
+        """
+        Read and remove the items of ``slots``. A slot can be claimed a
+        moment before its item is written, so missing slots are polled
+        briefly. Returns ``(items, missing_slots)``.
+        """
+        items = {}
+        missing = list(slots)
+        for attempt in range(attempts):
+            found = self.store.get_many([self._key(sequence, slot) for slot in missing])
+            for slot in missing:
+                value = found.get(self._key(sequence, slot))
+                if value is not None and value != ABANDONED:
+                    items[slot] = value
+            missing = [slot for slot in missing if slot not in items]
+            if not missing:
+                break
+            time.sleep(pause)
+        self.store.delete_many([self._key(sequence, slot) for slot in items])
+        return [items[slot] for slot in sorted(items)], missing
+
+    def abandon(self, sequence, slots):
+        """
+        Give up on ``slots``: each still-empty slot is marked so that its
+        item can no longer be written. Returns the items that arrived in
+        the meantime.
+        """
+        late = [slot for slot in slots
+                if not self.store.add(self._key(sequence, slot), ABANDONED, timeout=ITEM_TIMEOUT)]
+        return self.collect(sequence, late, attempts=1)[0] if late else []
@@ -0,0 +1,133 @@
+import time
+from datetime import datetime, timezone
+from django.conf import settings
+from django.core.cache import caches
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one ``Destination``, with its state kept in the
+    shared cache (``CIRCUIT_CACHE_ALIAS``) so that every worker and the
+    API see the same breaker.
+
+    Calls and failures are counted in fixed time buckets covering the last
+    ``CIRCUIT_WINDOW_SECONDS``. A call slower than
+    ``CIRCUIT_SLOW_CALL_SECONDS`` counts as a failure. Once the window holds
+    at least ``CIRCUIT_MIN_CALLS`` calls and the failure ratio reaches
+    ``CIRCUIT_ERROR_RATE`` the breaker opens. After
+    ``CIRCUIT_COOLDOWN_SECONDS`` it is half-open: a single probe is let
+    through, and its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, destination_id):
+        self.destination_id = destination_id
+        self.window = _setting("CIRCUIT_WINDOW_SECONDS", 60)
+        self.bucket_seconds = _setting("CIRCUIT_BUCKET_SECONDS", 10)
+        self.min_calls = _setting("CIRCUIT_MIN_CALLS", 20)
+        self.error_rate = _setting("CIRCUIT_ERROR_RATE", 0.5)
+        self.slow_call = _setting("CIRCUIT_SLOW_CALL_SECONDS", 5)
+        self.cooldown = _setting("CIRCUIT_COOLDOWN_SECONDS", 30)
+        self.cache_alias = _setting("CIRCUIT_CACHE_ALIAS", "shared")
+
+    @property
+    def store(self):
+        return caches[self.cache_alias]
+
+    def _key(self, suffix):
+        return f"circuit_{self.destination_id}_{suffix}"
+
+    def _bucket_keys(self, kind):
+        current = int(time.time() // self.bucket_seconds)
+        count = max(1, self.window // self.bucket_seconds)
+        return [self._key(f"{kind}_{bucket}") for bucket in range(current - count + 1, current + 1)]
+
+    def _incr(self, key):
+        self.store.add(key, 0, timeout=self.window + self.bucket_seconds)
+        try:
+            return self.store.incr(key)
+        except ValueError:
+            # The key expired between add and incr.
+            self.store.add(key, 1, timeout=self.window + self.bucket_seconds)
+            return 1
+
+    def _counts(self):
+        call_keys = self._bucket_keys("calls")
+        failure_keys = self._bucket_keys("failures")
+        values = self.store.get_many(call_keys + failure_keys)
+        calls = sum(values.get(key, 0) for key in call_keys)
+        failures = sum(values.get(key, 0) for key in failure_keys)
+        return calls, failures
+
+    def _opened_at(self):
+        return self.store.get(self._key("opened_at"))
+
+    def state(self):
+        opened_at = self._opened_at()
+        if opened_at is None:
+            return CLOSED
+        if time.time() - opened_at < self.cooldown:
+            return OPEN
+        return HALF_OPEN
+
+    def retry_in(self):
+        """Seconds until the breaker lets a probe through; zero when closed."""
+        opened_at = self._opened_at()
+        if opened_at is None:
+            return 0
+        return max(0, self.cooldown - (time.time() - opened_at))
+
+    def allow_request(self):
+        state = self.state()
+        if state == CLOSED:
+            return True
+        if state == OPEN:
+            return False
+        return self.store.add(self._key("probe"), 1, timeout=self.cooldown)
+
+    def record(self, success, latency=None):
+        """Record the outcome of an attempted call."""
+        if latency is not None and latency >= self.slow_call:
+            success = False
+        if self._opened_at() is not None:
+            if success:
+                self._close()
+            else:
+                self._open()
+            return
+        current_calls = self._bucket_keys("calls")[-1]
+        self._incr(current_calls)
+        if not success:
+            self._incr(self._bucket_keys("failures")[-1])
+            calls, failures = self._counts()
+            if calls >= self.min_calls and failures / calls >= self.error_rate:
+                self._open()
+
+    def _open(self):
+        self.store.set(self._key("opened_at"), time.time(), timeout=None)
+        self.store.delete(self._key("probe"))
+
+    def _close(self):
+        self.store.delete_many([self._key("opened_at"), self._key("probe")]
+                          + self._bucket_keys("calls") + self._bucket_keys("failures"))
+
+    def snapshot(self):
+        calls, failures = self._counts()
+        opened_at = self._opened_at()
+        return {
+            "destination": self.destination_id,
+            "state": self.state(),
+            "calls": calls,
+            "failures": failures,
+            "error_rate": round(failures / calls, 4) if calls else 0.0,
+            "opened_at": (datetime.fromtimestamp(opened_at, tz=timezone.utc).isoformat()
+                          if opened_at is not None else None),
+            "retry_in": round(self.retry_in(), 3),
+        }
@@ -0,0 +1,93 @@
+import hashlib
+import math
+from django.conf import settings
+from django.core.cache import caches
+
+
+class BloomFilter:
+    """A fixed-size Bloom filter sized for ``capacity`` items at ``error_rate``."""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(key))
+
+
+class EventDeduplicator:
+    """
+    Deduplicates ``(account, event_id)`` pairs across processes and hosts.
+
+    The shared backing store is a Django cache (``DEDUP_CACHE_ALIAS``); an
+    id is claimed with an atomic add-if-absent that expires after
+    ``DEDUP_RETENTION_SECONDS``, so there is no read-then-write race. On
+    Redis the adds of one call are pipelined into a single round-trip, so
+    a call costs one round-trip whether its ids are new or repeated.
+    """
+
+    def __init__(self, cache_alias="shared", retention=86400):
+        self.cache_alias = cache_alias
+        self.retention = retention
+
+    @property
+    def store(self):
+        return caches[self.cache_alias]
+
+    @staticmethod
+    def make_key(account_id, event_id):
+        return f"dedup:{account_id}:{event_id}"
+
+    def claim(self, account_id, event_ids):
+        """
+        Record ``event_ids`` as received for the account and return a list
+        of booleans telling which ids are new. An id repeated inside
+        ``event_ids`` is only new at its first position.
+        """
+        keys = [self.make_key(account_id, event_id) for event_id in event_ids]
+        added = self._add_many(list(dict.fromkeys(keys)))
+
+        claimed = []
+        pending = set(key for key, is_new in added.items() if is_new)
+        for key in keys:
+            claimed.append(key in pending)
+            pending.discard(key)
+        return claimed
+
+    def release(self, account_id, event_ids):
+        """Forget claimed ``event_ids`` so that a retry of them is accepted."""
+        self.store.delete_many([self.make_key(account_id, event_id) for event_id in event_ids])
+
+    def _add_many(self, keys):
+        """Atomically add every key that is absent; return ``{key: added}``."""
+        if not keys:
+            return {}
+        store = self.store
+        get_client = getattr(getattr(store, "_cache", None), "get_client", None)
+        if get_client is not None:
+            pipeline = get_client(write=True).pipeline(transaction=False)
+            for key in keys:
+                pipeline.set(store.make_and_validate_key(key), 1, nx=True, ex=self.retention)
+            return {key: bool(added) for key, added in zip(keys, pipeline.execute())}
+        return {key: store.add(key, 1, timeout=self.retention) for key in keys}
+
+
+deduplicator = EventDeduplicator(
+    cache_alias=getattr(settings, "DEDUP_CACHE_ALIAS", "shared"),
+    retention=getattr(settings, "DEDUP_RETENTION_SECONDS", 86400),
+)
@@ -0,0 +1,78 @@
+import csv
+import json
+from itertools import chain
+from django.conf import settings
+from rest_framework.utils.encoders import JSONEncoder
+
+# Export column -> queryset path, in the order of ``LogSerializer``.
+EXPORT_FIELDS = {
+    "id": "id",
+    "event_id": "event__event_id",
+    "received_timestamp": "received_timestamp",
+    "processed_timestamp": "processed_timestamp",
+    "received_data": "event__received_data",
+    "status": "status",
+    "attempt": "attempt",
+    "batch_id": "batch_id",
+    "account": "account_id",
+    "destination": "destination_id",
+}
+
+CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def iter_log_rows(queryset):
+    """
+    Yield log rows as dicts keyed by export column. Rows are read through
+    ``.values()`` and a chunked database cursor, so no model instances are
+    built and memory stays flat however many rows are exported.
+    """
+    chunk_size = getattr(settings, "LOG_EXPORT_CHUNK_SIZE", 2000)
+    paths = list(EXPORT_FIELDS.values())
+    for values in queryset.values_list(*paths).iterator(chunk_size=chunk_size):
+        yield dict(zip(EXPORT_FIELDS, values))
+
+
+def encode_json(value):
+    """JSON text of one value, formatted the way the API renders it."""
+    return json.dumps(value, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":"))
+
+
+def iter_ndjson(queryset, archived=()):
+    """NDJSON lines of the rows of ``queryset``, then of the ``archived`` rows (already in export format)."""
+    for row in chain(iter_log_rows(queryset), archived):
+        yield encode_json(row) + "\n"
+
+
+class _Echo:
+    """File-like object whose ``write`` hands back the line ``csv.writer`` produced."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_cell(value):
+    """Empty for NULL, otherwise the text the JSON API shows for the value."""
+    if value is None:
+        return ""
+    if isinstance(value, (str, int)):
+        return value
+    return encode_json(value).strip('"')
+
+
+def iter_csv(queryset, archived=()):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in chain(iter_log_rows(queryset), archived):
+        # The payload column always holds JSON, whatever the payload's type.
+        yield writer.writerow([encode_json(value) if column == "received_data" else _csv_cell(value)
+                               for column, value in row.items()])
+
+
+EXPORTERS = {
+    "ndjson": iter_ndjson,
+    "csv": iter_csv,
+}
@@ -0,0 +1,123 @@
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.relations import PrimaryKeyRelatedField, RelatedField
+from rest_framework.response import Response
+
+_readers = {}
+
+
+class RowReader:
+    """
+    Builds the representation a serializer would return from ``.values()``
+    rows. ``columns`` holds ``(output name, values path, converter)``; the
+    converters are the serializer fields' own ``to_representation``, or
+    ``None`` for primary keys, which are passed through as they are.
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.paths = list(dict.fromkeys(path for _, path, _ in columns))
+
+    def to_representation(self, row):
+        data = {}
+        for name, path, convert in self.columns:
+            value = row[path]
+            data[name] = value if value is None or convert is None else convert(value)
+        return data
+
+    def convert(self, rows):
+        return [self.to_representation(row) for row in rows]
+
+
+def _column(model, field):
+    """``(name, path, converter)`` of one serializer field, or ``None`` if it needs an instance."""
+    if isinstance(field, PrimaryKeyRelatedField):
+        if len(field.source_attrs) != 1:
+            return None
+        try:
+            model_field = model._meta.get_field(field.source_attrs[0])
+        except FieldDoesNotExist:
+            return None
+        if not (model_field.concrete and (model_field.many_to_one or model_field.one_to_one)):
+            return None
+        convert = field.pk_field.to_representation if field.pk_field is not None else None
+        return field.field_name, model_field.attname, convert
+    if isinstance(field, (RelatedField, serializers.ManyRelatedField, serializers.BaseSerializer)):
+        return None
+    if field.source == "*":
+        return None
+    *relations, name = field.source_attrs
+    for relation in relations:
+        try:
+            model_field = model._meta.get_field(relation)
+        except FieldDoesNotExist:
+            return None
+        if not (model_field.many_to_one or model_field.one_to_one) or not model_field.concrete:
+            return None
+        model = model_field.related_model
+    try:
+        model_field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+    if not model_field.concrete or model_field.is_relation:
+        return None
+    return field.field_name, "__".join(field.source_attrs), field.to_representation
+
+
+def row_reader(serializer_class, field_names=None):
+    """
+    The ``RowReader`` of ``serializer_class``, limited to ``field_names``
+    when given, compiled once per process. ``None`` when the serializer
+    customizes its representation or has a field that cannot be read from
+    a column, in which case callers fall back to the serializer.
+    """
+    # Columns follow the serializer's field order, so only the set of names matters;
+    # the cache is bounded by the subsets of validated field names.
+    key = (serializer_class, frozenset(field_names) if field_names else None)
+    if key not in _readers:
+        _readers[key] = _compile(serializer_class, field_names)
+    return _readers[key]
+
+
+def _compile(serializer_class, field_names):
+    if not issubclass(serializer_class, serializers.ModelSerializer):
+        return None
+    if serializer_class.to_representation is not serializers.Serializer.to_representation:
+        return None
+    model = serializer_class.Meta.model
+    columns = []
+    for field in serializer_class()._readable_fields:
+        if field_names and field.field_name not in field_names:
+            continue
+        column = _column(model, field)
+        if column is None:
+            return None
+        columns.append(column)
+    return RowReader(columns)
+
+
+class FastListMixin:
+    """
+    Serves ``list`` from ``.values()`` rows converted by a precompiled
+    ``RowReader``, so no model instances or serializers are built. The
+    output is the same as the serializer's; viewsets whose serializer
+    cannot be read this way, or ``FAST_READ_PATH = False``, keep the
+    regular path.
+    """
+
+    def get_row_reader(self):
+        if not getattr(settings, "FAST_READ_PATH", True):
+            return None
+        names = self.get_sparse_fields() if hasattr(self, "get_sparse_fields") else None
+        return row_reader(self.get_serializer_class(), names)
+
+    def list(self, request, *args, **kwargs):
+        reader = self.get_row_reader()
+        if reader is None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset()).values(*reader.paths)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(reader.convert(page))
+        return Response(reader.convert(queryset))
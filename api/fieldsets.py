@@ -0,0 +1,71 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+
+
+class SparseFieldsetMixin:
+    """
+    ``?fields=a,b`` on GET requests limits the response to those fields.
+
+    The queryset only selects the columns behind them, via ``.only()``,
+    and the serializer drops every other field before it runs, so neither
+    the database nor serialization pays for columns nobody asked for.
+    Related objects are rendered as primary keys and are never joined.
+    """
+    fields_query_param = "fields"
+
+    def get_sparse_fields(self):
+        """Requested field names, ``None`` when the full representation is wanted."""
+        if not hasattr(self, "_sparse_fields"):
+            self._sparse_fields = self.parse_sparse_fields()
+        return self._sparse_fields
+
+    def get_readable_fields(self):
+        """Serializer fields that appear in responses, by name; write-only fields are left out."""
+        return {field.field_name: field for field in self.get_serializer_class()()._readable_fields}
+
+    def parse_sparse_fields(self):
+        if self.request.method != "GET":
+            return None
+        raw = self.request.query_params.get(self.fields_query_param, "")
+        names = list(dict.fromkeys(name.strip() for name in raw.split(",") if name.strip()))
+        if not names:
+            return None
+        available = self.get_readable_fields()
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            raise ValidationError({self.fields_query_param: f"Unknown field(s): {', '.join(unknown)}. "
+                                                            f"Use: {', '.join(available)}."})
+        return names
+
+    def get_sparse_columns(self, queryset, names):
+        """Model fields for ``.only()``, or ``None`` when a field is not backed by a column."""
+        serializer_fields = self.get_readable_fields()
+        columns = [queryset.model._meta.pk.name]
+        for name in names:
+            source = serializer_fields[name].source
+            try:
+                field = queryset.model._meta.get_field(source)
+            except FieldDoesNotExist:
+                return None
+            if not field.concrete:
+                return None
+            columns.append(field.name)
+        return columns
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        names = self.get_sparse_fields()
+        columns = self.get_sparse_columns(queryset, names) if names else None
+        if columns:
+            queryset = queryset.select_related(None).only(*columns)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        names = self.get_sparse_fields()
+        if names:
+            target = getattr(serializer, "child", serializer)
+            for name in list(target.fields):
+                if name not in names:
+                    target.fields.pop(name)
+        return serializer
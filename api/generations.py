@@ -0,0 +1,52 @@
+import time
+from django.conf import settings
+from django.core.cache import caches
+
+GLOBAL_SCOPE = "global"
+
+
+def account_scope(account_id):
+    return f"account:{account_id}"
+
+
+def user_scope(user_id):
+    return f"user:{user_id}"
+
+
+def _generation_key(scope):
+    return f"generation_{scope}"
+
+
+def _store():
+    return caches[getattr(settings, "GENERATION_CACHE_ALIAS", "shared")]
+
+
+def _fresh_generation():
+    # Never restart at a small number: a counter that was evicted must not
+    # bring back the keys of an earlier generation.
+    return time.time_ns()
+
+
+def get_generations(scopes):
+    """Current generation of each scope, starting the ones never seen before."""
+    cache = _store()
+    keys = {scope: _generation_key(scope) for scope in scopes}
+    found = cache.get_many(list(keys.values()))
+    generations = {}
+    for scope, key in keys.items():
+        if key not in found:
+            cache.add(key, _fresh_generation(), timeout=None)
+            found[key] = cache.get(key)
+        generations[scope] = found[key]
+    return generations
+
+
+def bump_generations(*scopes):
+    """Invalidate every cached response that depends on ``scopes``; one atomic increment each."""
+    cache = _store()
+    for scope in scopes:
+        key = _generation_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _fresh_generation(), timeout=None)
@@ -0,0 +1,113 @@
+import http.cookiejar
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+
+class SessionPool:
+    """
+    Keeps one keep-alive ``requests.Session`` per destination host so that
+    deliveries reuse TCP/TLS connections instead of opening a new one per
+    request. Sessions idle for longer than ``idle_timeout`` seconds are
+    closed, and at most ``max_hosts`` idle sessions are kept per process.
+    Pooled sessions never store cookies.
+    """
+
+    def __init__(self, pool_size=10, idle_timeout=90, max_hosts=256):
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.max_hosts = max_hosts
+        self._sessions = {}
+        self._last_used = {}
+        self._leases = {}  # host -> requests in flight on its session
+        self._last_sweep = time.monotonic()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host_key(url):
+        parts = urlsplit(url)
+        return parts.scheme, parts.netloc
+
+    def _new_session(self):
+        session = requests.Session()
+        # A host's session is shared by every account posting to it; cookies
+        # one tenant's endpoint sets must never be replayed for another.
+        session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, pool_block=False)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    @contextmanager
+    def lease(self, url):
+        """
+        Yield the pooled session for the host of ``url`` for one request.
+        A leased session is never evicted: idle sweeps and the ``max_hosts``
+        cap only close sessions no thread is using, and the pool may go past
+        the cap while every session is busy.
+        """
+        key = self.host_key(url)
+        current = time.monotonic()
+        with self._lock:
+            if current - self._last_sweep >= self.idle_timeout / 2:
+                self._evict(lambda host: current - self._last_used[host] > self.idle_timeout)
+                self._last_sweep = current
+            session = self._sessions.get(key)
+            if session is None:
+                if len(self._sessions) >= self.max_hosts:
+                    idle = [host for host in self._sessions if not self._leases.get(host)]
+                    if idle:
+                        oldest = min(idle, key=self._last_used.get)
+                        self._evict(lambda host: host == oldest)
+                session = self._sessions[key] = self._new_session()
+            self._last_used[key] = current
+            self._leases[key] = self._leases.get(key, 0) + 1
+        try:
+            yield session
+        finally:
+            with self._lock:
+                self._last_used[key] = time.monotonic()
+                self._leases[key] -= 1
+                if not self._leases[key]:
+                    del self._leases[key]
+
+    def _evict(self, predicate):
+        for host in [host for host in self._sessions if not self._leases.get(host) and predicate(host)]:
+            self._sessions.pop(host).close()
+            del self._last_used[host]
+
+    def close(self):
+        with self._lock:
+            self._evict(lambda host: True)
+
+    def reset(self):
+        """Forget sessions inherited from a parent process without closing their sockets."""
+        self._sessions = {}
+        self._last_used = {}
+        self._leases = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+def get_timeout():
+    """``(connect, read)`` timeout applied to every delivery request."""
+    return (getattr(settings, "DELIVERY_CONNECT_TIMEOUT", 3.05),
+            getattr(settings, "DELIVERY_READ_TIMEOUT", 10))
+
+
+session_pool = SessionPool(
+    pool_size=getattr(settings, "DELIVERY_POOL_SIZE", 10),
+    idle_timeout=getattr(settings, "DELIVERY_POOL_IDLE_TIMEOUT", 90),
+    max_hosts=getattr(settings, "DELIVERY_POOL_MAX_HOSTS", 256),
+)
+
+# Celery's prefork pool forks workers after import; each child needs its own sockets.
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=session_pool.reset)
@@ -0,0 +1,36 @@
+from django.conf import settings
+from .dedup import deduplicator
+from .tasks import send_data_to_destinations
+
+
+def claim_event_ids(account_id, event_ids):
+    """
+    Mark ``event_ids`` as received for the account and return a list of
+    booleans telling which ids are new. See ``EventDeduplicator.claim``.
+    """
+    return deduplicator.claim(account_id, event_ids)
+
+
+def release_event_ids(account_id, event_ids):
+    """Undo ``claim_event_ids`` for ids whose events were not enqueued."""
+    deduplicator.release(account_id, event_ids)
+
+
+def enqueue_events(account_id, events):
+    """
+    Enqueue ``(event_id, data)`` pairs for delivery. Events are grouped
+    into chunks so that one broker message carries many events. If the
+    broker refuses them, their claimed ids are released before the error
+    propagates, so the client can retry them.
+    """
+    if not events:
+        return
+    chunk_size = getattr(settings, "INGEST_ENQUEUE_CHUNK_SIZE", 100)
+    try:
+        send_data_to_destinations.chunks(
+            [(account_id, event_id, data) for event_id, data in events],
+            chunk_size,
+        ).apply_async()
+    except Exception:
+        release_event_ids(account_id, [event_id for event_id, _ in events])
+        raise
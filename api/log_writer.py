@@ -0,0 +1,110 @@
+import atexit
+import logging
+import threading
+from celery.signals import worker_process_shutdown, worker_shutdown
+from django.conf import settings
+from django.db import connections, transaction
+from api.models import Log
+from api.stats import record_deliveries
+
+logger = logging.getLogger(__name__)
+
+
+class LogWriter:
+    """
+    Buffers delivery ``Log`` rows and writes them with one ``bulk_create``
+    per transaction instead of one INSERT per delivery.
+
+    With ``flush_interval`` of zero the buffer is flushed at the end of
+    every task. A positive interval lets rows from several tasks share a
+    flush; a timer thread then flushes the buffer at most
+    ``flush_interval`` seconds after its first row arrived. The buffer
+    never holds more than ``max_buffer`` rows, and it is flushed when the
+    worker shuts down. Each flush also folds its rows, with the latency
+    given to ``add``, into the per-destination ``DeliveryStat`` rollups
+    in the same transaction.
+
+    A flush that fails puts its rows back in the buffer, dropping the
+    oldest ones past ``max_buffer`` with a warning, and re-raises. Only
+    ``flush_if_due``, ``flush`` and shutdown surface that error: a flush
+    started by ``add`` or by the timer is logged, so a delivery task is
+    never stopped halfway through its destinations.
+    """
+
+    def __init__(self, max_buffer=1000, flush_interval=0):
+        self.max_buffer = max_buffer
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def add(self, log, latency=None):
+        with self._lock:
+            self._buffer.append((log, latency))
+            full = len(self._buffer) >= self.max_buffer
+            if not full and self.flush_interval > 0 and self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self._flush_from_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Log flush failed; %d rows stay buffered", len(self._buffer))
+
+    def flush(self):
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if rows:
+            try:
+                with transaction.atomic():
+                    Log.objects.bulk_create([log for log, _ in rows], batch_size=500)
+                    record_deliveries(rows)
+            except Exception:
+                # Nothing was written; keep the rows, without the rolled-back ids, for the next flush.
+                for log, _ in rows:
+                    log.pk = None
+                with self._lock:
+                    self._buffer[:0] = rows
+                    dropped = len(self._buffer) - self.max_buffer
+                    if dropped > 0:
+                        del self._buffer[:dropped]
+                if dropped > 0:
+                    logger.warning("Log buffer full while the database is failing; dropped the %d oldest rows",
+                                   dropped)
+                raise
+        return [log for log, _ in rows]
+
+    def flush_if_due(self):
+        """Called at the end of a task; flushes unless a timer owns the buffer."""
+        if self.flush_interval <= 0:
+            self.flush()
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Log flush failed; %d rows stay buffered", len(self._buffer))
+        finally:
+            connections.close_all()
+
+    def __len__(self):
+        return len(self._buffer)
+
+
+log_writer = LogWriter(
+    max_buffer=getattr(settings, "LOG_WRITER_MAX_BUFFER", 1000),
+    flush_interval=getattr(settings, "LOG_WRITER_FLUSH_INTERVAL", 0),
+)
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def flush_logs_on_shutdown(**kwargs):
+    log_writer.flush()
+
+
+atexit.register(log_writer.flush)
@@ -0,0 +1,75 @@
+import io
+import timeit
+import uuid
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from api.parsers import FastJSONParser, orjson
+from api.renderers import FastJSONRenderer
+
+
+def ingest_event(n):
+    """An incoming event body like the ones posted to /server/incoming_data/."""
+    return {
+        "data": {
+            "order_id": f"ord-{n:08d}",
+            "customer": {"id": n, "email": f"customer{n}@example.com", "name": "Zoë Example"},
+            "items": [{"sku": f"SKU-{n}-{i}", "qty": i + 1, "price": 19.99 + i} for i in range(5)],
+            "tags": ["priority", "gift"],
+            "paid": True,
+        },
+    }
+
+
+def log_page(rows):
+    """A /logs/ page of ``rows`` entries, as the fast read path hands it to the renderer."""
+    start = now()
+    return {
+        "next": "https://example.com/logs/?cursor=eyJ2IjoxfQ",
+        "previous": None,
+        "results": [{
+            "id": n,
+            "event_id": f"evt-{n}",
+            "received_timestamp": start - timedelta(seconds=n),
+            "processed_timestamp": start - timedelta(seconds=n) + timedelta(milliseconds=40),
+            "received_data": ingest_event(n)["data"],
+            "status": "success",
+            "attempt": 1,
+            "batch_id": uuid.uuid4(),
+            "account": 1,
+            "destination": n % 4 + 1,
+        } for n in range(rows)],
+    }
+
+
+class Command(BaseCommand):
+    help = "Compare DRF's stdlib JSON parser and renderer with the orjson-backed ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5, help="Timing runs per case; the best is reported")
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING("orjson is not installed: the fast classes fall back to the stdlib."))
+        repeat = options["repeat"]
+        cases = [("event", ingest_event(1)), ("batch 100", [ingest_event(n) for n in range(100)]),
+                 ("logs 100", log_page(100)), ("logs 1000", log_page(1000))]
+        self.stdout.write(f"{'case':<12}{'bytes':>10}{'render std':>14}{'render fast':>14}"
+                          f"{'parse std':>14}{'parse fast':>14}")
+        for name, data in cases:
+            body = JSONRenderer().render(data)
+            number = max(1, 200_000 // len(body))
+            timings = [
+                self.best(lambda: JSONRenderer().render(data), number, repeat),
+                self.best(lambda: FastJSONRenderer().render(data), number, repeat),
+                self.best(lambda: JSONParser().parse(io.BytesIO(body)), number, repeat),
+                self.best(lambda: FastJSONParser().parse(io.BytesIO(body)), number, repeat),
+            ]
+            self.stdout.write(f"{name:<12}{len(body):>10}" + "".join(f"{t * 1e6:>12.1f}us" for t in timings))
+        self.stdout.write("Times are per call, the best of each run.")
+
+    @staticmethod
+    def best(func, number, repeat):
+        return min(timeit.repeat(func, number=number, repeat=repeat)) / number
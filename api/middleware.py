@@ -0,0 +1,231 @@
+import io
+import zlib
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError
+
+try:
+    import brotli
+except ImportError:  # br bodies are refused and never offered
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # zstd bodies are refused and never offered
+    zstandard = None
+
+
+class RequestBodyTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "Decompressed request body is too large."
+    default_code = "request_too_large"
+
+
+def _gzip_chunks(read, chunk_size):
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    while data := read(chunk_size):
+        while data:
+            if decompressor.eof:  # Another gzip member follows
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            # max_length keeps each step's output bounded, however well the input compresses.
+            yield decompressor.decompress(data, chunk_size)
+            data = decompressor.unused_data if decompressor.eof else decompressor.unconsumed_tail
+    if not decompressor.eof:
+        raise zlib.error("truncated gzip body")
+
+
+def _zstd_chunks(read, chunk_size):
+    reader = zstandard.ZstdDecompressor().stream_reader(_Reader(read), read_size=chunk_size,
+                                                        read_across_frames=True)
+    while data := reader.read(chunk_size):
+        yield data
+
+
+def _br_chunks(read, chunk_size):
+    decompressor = brotli.Decompressor()
+    while data := read(chunk_size):
+        # Small input steps bound the output of each call.
+        for start in range(0, len(data), 1024):
+            yield decompressor.process(data[start:start + 1024])
+    if not decompressor.is_finished():
+        raise brotli.error("truncated br body")
+
+
+class _Reader:
+    """File-like view of a ``read`` callable, for decoders that pull their input."""
+
+    def __init__(self, read):
+        self.read = read
+
+
+DECODERS = {"gzip": _gzip_chunks, "x-gzip": _gzip_chunks}
+if zstandard is not None:
+    DECODERS["zstd"] = _zstd_chunks
+if brotli is not None:
+    DECODERS["br"] = _br_chunks
+
+DECODE_ERRORS = tuple(error for error in [zlib.error, getattr(zstandard, "ZstdError", None),
+                                          getattr(brotli, "error", None)] if error)
+
+
+class DecompressingStream(io.RawIOBase):
+    """
+    Readable stream of the decoded bytes of ``raw``. Input is read and
+    decoded one chunk at a time, so memory stays bounded by the chunk size,
+    and reading past ``limit`` decoded bytes raises ``RequestBodyTooLarge``.
+    """
+
+    def __init__(self, raw, encoding, limit, chunk_size):
+        self.limit = limit
+        self.total = 0
+        self._chunks = DECODERS[encoding](raw.read, chunk_size)
+        self._pending = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        try:
+            while not self._pending:
+                self._pending = next(self._chunks)
+        except StopIteration:
+            return 0
+        except DECODE_ERRORS as exc:
+            raise ParseError(f"Content-Encoding decode error - {exc}")
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        self.total += size
+        if self.total > self.limit:
+            raise RequestBodyTooLarge(f"Decompressed request body exceeds {self.limit} bytes.")
+        return size
+
+
+class RequestDecompressionMiddleware:
+    """
+    Decodes ``gzip`` request bodies, and ``zstd`` or ``br`` ones when their
+    libraries are installed, on the ``INGEST_DECOMPRESS_PATHS`` prefixes.
+    The body is decoded as the view reads it, and at most
+    ``INGEST_MAX_DECOMPRESSED_BYTES`` are accepted.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        encoding = request.META.get("HTTP_CONTENT_ENCODING", "").strip().lower()
+        paths = getattr(settings, "INGEST_DECOMPRESS_PATHS", ["/server/incoming_data/"])
+        if encoding and encoding != "identity" and request.path.startswith(tuple(paths)):
+            if encoding not in DECODERS:
+                response = JsonResponse({"success": False, "message": f"Unsupported Content-Encoding '{encoding}'"},
+                                        status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+                response["Accept-Encoding"] = ", ".join(DECODERS)
+                return response
+            stream = DecompressingStream(
+                request._stream, encoding,
+                limit=getattr(settings, "INGEST_MAX_DECOMPRESSED_BYTES", 50 * 1024 * 1024),
+                chunk_size=getattr(settings, "INGEST_DECOMPRESS_CHUNK_SIZE", 64 * 1024),
+            )
+            request._stream = io.BufferedReader(stream)
+        return self.get_response(request)
+
+
+def _gzip_compress(content):
+    return compress_string(content)
+
+
+def _br_compress(content):
+    return brotli.compress(content, quality=5)
+
+
+def _zstd_compress(content):
+    return zstandard.ZstdCompressor(level=3).compress(content)
+
+
+def _br_stream(chunks):
+    compressor = brotli.Compressor(quality=5)
+    for chunk in chunks:
+        yield compressor.process(chunk) + compressor.flush()
+    yield compressor.finish()
+
+
+def _zstd_stream(chunks):
+    compressor = zstandard.ZstdCompressor(level=3).compressobj()
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+    yield compressor.flush()
+
+
+# Encoding -> (whole body, streamed body), in server preference order.
+ENCODERS = {}
+if zstandard is not None:
+    ENCODERS["zstd"] = (_zstd_compress, _zstd_stream)
+if brotli is not None:
+    ENCODERS["br"] = (_br_compress, _br_stream)
+ENCODERS["gzip"] = (_gzip_compress, compress_sequence)
+
+
+def negotiate_encoding(accept_encoding):
+    """The preferred encoding of ``ENCODERS`` an ``Accept-Encoding`` header allows, or ``None``."""
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().lower().partition(";")
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if name:
+            weights[name.strip()] = weight
+    best, best_weight = None, 0.0
+    for encoding in ENCODERS:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+class ResponseCompressionMiddleware:
+    """
+    Compresses successful GET responses on the ``RESPONSE_COMPRESSION_PATHS``
+    prefixes (the list and export endpoints) with the best encoding the
+    client accepts: ``zstd`` or ``br`` when installed, else ``gzip``.
+    Bodies under ``RESPONSE_COMPRESSION_MIN_BYTES`` are sent as they are;
+    streamed exports are compressed chunk by chunk.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        paths = getattr(settings, "RESPONSE_COMPRESSION_PATHS", [])
+        if request.method != "GET" or response.status_code != 200 or not request.path.startswith(tuple(paths)):
+            return response
+        if response.has_header("Content-Encoding"):
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = negotiate_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+        compress, compress_stream = ENCODERS[encoding]
+        if response.streaming:
+            response.streaming_content = compress_stream(response.streaming_content)
+            del response.headers["Content-Length"]
+        else:
+            if len(response.content) < getattr(settings, "RESPONSE_COMPRESSION_MIN_BYTES", 1024):
+                return response
+            response.content = compress(response.content)
+            response.headers["Content-Length"] = str(len(response.content))
+        # A strong ETag names exact bytes; the compressed body only matches weakly.
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:29
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0005_destination_log"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="log",
+            name="event_id",
+            field=models.UUIDField(db_index=True, default=uuid.uuid4, editable=False),
+        ),
+    ]
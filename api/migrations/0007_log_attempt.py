@@ -0,0 +1,30 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0006_log_event_id_not_unique"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="log",
+            name="attempt",
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.AlterField(
+            model_name="log",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("success", "Success"),
+                    ("failed", "Failed"),
+                    ("retrying", "Retrying"),
+                ],
+                max_length=10,
+            ),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0007_log_attempt"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="log",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("success", "Success"),
+                    ("failed", "Failed"),
+                    ("retrying", "Retrying"),
+                    ("deferred", "Deferred"),
+                ],
+                max_length=10,
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0008_log_status_deferred"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="destination",
+            name="batch_enabled",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="destination",
+            name="batch_max_events",
+            field=models.PositiveIntegerField(default=100),
+        ),
+        migrations.AddField(
+            model_name="destination",
+            name="batch_max_wait_ms",
+            field=models.PositiveIntegerField(default=1000),
+        ),
+        migrations.AddField(
+            model_name="log",
+            name="batch_id",
+            field=models.UUIDField(blank=True, db_index=True, null=True),
+        ),
+    ]
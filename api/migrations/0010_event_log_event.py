@@ -0,0 +1,142 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+CHUNK_SIZE = 500  # Log rows per step; keeps the CASE below under SQLite's parameter limit
+
+
+def move_payloads_to_events(apps, schema_editor):
+    """Create one Event per (account, event id) and point its log rows at it.
+
+    Works through the logs in id-ordered chunks: the chunk's missing events
+    are inserted with one bulk_create and its rows are repointed with one
+    UPDATE, so memory and round trips stay bounded by the chunk size.
+    """
+    Event = apps.get_model("api", "Event")
+    Log = apps.get_model("api", "Log")
+    last_id = 0
+    while True:
+        rows = list(
+            Log.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values("id", "account_id", "legacy_event_id", "received_data", "received_timestamp")[:CHUNK_SIZE]
+        )
+        if not rows:
+            break
+        first_id, last_id = rows[0]["id"], rows[-1]["id"]
+
+        keys = {}
+        for row in rows:  # The oldest row of a key supplies the event's payload
+            keys.setdefault((row["account_id"], str(row["legacy_event_id"])), row)
+
+        def existing():
+            return {
+                (account_id, event_id): pk
+                for pk, account_id, event_id in Event.objects.filter(
+                    account_id__in={account_id for account_id, _ in keys},
+                    event_id__in={event_id for _, event_id in keys},
+                ).values_list("id", "account_id", "event_id")
+                if (account_id, event_id) in keys
+            }
+
+        event_ids = existing()
+        Event.objects.bulk_create(
+            Event(
+                account_id=key[0],
+                event_id=key[1],
+                received_data=row["received_data"],
+                received_timestamp=row["received_timestamp"],
+            )
+            for key, row in keys.items()
+            if key not in event_ids
+        )
+        event_ids = existing()  # Not every backend returns primary keys from bulk_create
+
+        Log.objects.filter(id__gte=first_id, id__lte=last_id).update(
+            event=models.Case(
+                *(
+                    models.When(
+                        account_id=row["account_id"],
+                        legacy_event_id=row["legacy_event_id"],
+                        then=models.Value(event_ids[key]),
+                    )
+                    for key, row in keys.items()
+                ),
+                output_field=models.BigIntegerField(),
+            )
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0009_destination_micro_batching"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Event",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("event_id", models.CharField(max_length=255)),
+                ("received_data", models.JSONField()),
+                (
+                    "received_timestamp",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                (
+                    "account",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="events",
+                        to="api.account",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("account", "event_id")},
+            },
+        ),
+        migrations.RenameField(
+            model_name="log",
+            old_name="event_id",
+            new_name="legacy_event_id",
+        ),
+        migrations.AddField(
+            model_name="log",
+            name="event",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="logs",
+                to="api.event",
+            ),
+        ),
+        migrations.RunPython(move_payloads_to_events, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="log",
+            name="event",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="logs",
+                to="api.event",
+            ),
+        ),
+        migrations.RemoveField(
+            model_name="log",
+            name="legacy_event_id",
+        ),
+        migrations.RemoveField(
+            model_name="log",
+            name="received_data",
+        ),
+    ]
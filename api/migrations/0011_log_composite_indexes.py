@@ -0,0 +1,54 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0010_event_log_event"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="log",
+            name="account",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="logs",
+                to="api.account",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="log",
+            name="destination",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="logs",
+                to="api.destination",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="log",
+            index=models.Index(
+                fields=["-received_timestamp", "-id"], name="api_log_receive_3146ae_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="log",
+            index=models.Index(
+                fields=["account", "-received_timestamp", "-id"],
+                name="api_log_account_c0c536_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="log",
+            index=models.Index(
+                fields=["destination", "status", "-received_timestamp", "-id"],
+                name="api_log_destina_3b0ffc_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0011_log_composite_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="account",
+            name="log_retention_days",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="event",
+            name="account",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="events",
+                to="api.account",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="log",
+            name="account",
+            field=models.ForeignKey(
+                db_constraint=False,
+                db_index=False,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="logs",
+                to="api.account",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="log",
+            name="destination",
+            field=models.ForeignKey(
+                db_constraint=False,
+                db_index=False,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="logs",
+                to="api.destination",
+            ),
+        ),
+    ]
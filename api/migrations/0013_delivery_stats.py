@@ -0,0 +1,69 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0012_log_retention"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DeliveryStat",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "granularity",
+                    models.CharField(
+                        choices=[("minute", "Minute"), ("hour", "Hour")], max_length=6
+                    ),
+                ),
+                ("bucket", models.DateTimeField()),
+                ("success_count", models.PositiveIntegerField(default=0)),
+                ("failure_count", models.PositiveIntegerField(default=0)),
+                ("deferred_count", models.PositiveIntegerField(default=0)),
+                ("latency_total_ms", models.FloatField(default=0)),
+                ("latency_histogram", models.JSONField(default=list)),
+                (
+                    "account",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        db_index=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="delivery_stats",
+                        to="api.account",
+                    ),
+                ),
+                (
+                    "destination",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        db_index=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="delivery_stats",
+                        to="api.destination",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["account", "granularity", "bucket"],
+                        name="api_deliver_account_f4117a_idx",
+                    )
+                ],
+                "unique_together": {("destination", "granularity", "bucket")},
+            },
+        ),
+    ]
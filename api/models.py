@@ -2,6 +2,7 @@ import uuid
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.validators import URLValidator
+from django.utils.timezone import now
 import uuid
 
 User = get_user_model()
@@ -16,6 +17,8 @@ HTTP_METHODS = [
 STATUS_CHOICES = [
     ("success", "Success"),
     ("failed", "Failed"),
+    ("retrying", "Retrying"),
+    ("deferred", "Deferred"),
 ]
 
 # Create your models here
@@ -29,6 +32,7 @@ class Account(models.Model):
     updated_at = models.DateTimeField(auto_now=True,db_index=True)
     created_by = models.ForeignKey(User, related_name="created_accounts", on_delete=models.CASCADE,db_index=True)
     updated_by = models.ForeignKey(User, related_name="updated_accounts", on_delete=models.SET_NULL, null=True, blank=True,db_index=True)
+    log_retention_days = models.PositiveIntegerField(null=True, blank=True)  # None falls back to LOG_RETENTION_DAYS
 
     class Meta:
         indexes = [
@@ -108,6 +112,9 @@ class Destination(models.Model):
     url = models.URLField(validators=[URLValidator()], unique=True)
     http_method = models.CharField(max_length=10, choices=HTTP_METHODS)
     headers = models.JSONField()
+    batch_enabled = models.BooleanField(default=False)
+    batch_max_events = models.PositiveIntegerField(default=100)
+    batch_max_wait_ms = models.PositiveIntegerField(default=1000)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_destinations')
     updated_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='updated_destinations')
     created_at = models.DateTimeField(auto_now_add=True)
@@ -127,14 +134,68 @@ class Destination(models.Model):
 
         super().save(*args, **kwargs)
 
+class Event(models.Model):
+    """An incoming event. Its payload is stored once, however many destinations it fans out to."""
+    # Rows of a deleted account are removed in chunks by ``purge_deleted_rows``.
+    account = models.ForeignKey(Account, on_delete=models.DO_NOTHING, db_constraint=False, related_name='events')
+    event_id = models.CharField(max_length=255)
+    received_data = models.JSONField()
+    received_timestamp = models.DateTimeField(default=now)
+
+    class Meta:
+        unique_together = ("account", "event_id")
+
+    def __str__(self):
+        return f"Event {self.event_id}"
+
+
 class Log(models.Model):
-    event_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
-    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='logs')
-    destination = models.ForeignKey(Destination, on_delete=models.CASCADE, related_name='logs')
+    """One delivery attempt of an ``Event`` to a ``Destination``."""
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='logs')
+    # Both foreign keys lead the composite indexes below instead of having their own.
+    # Logs of a deleted account or destination are removed in chunks by ``purge_deleted_rows``.
+    account = models.ForeignKey(Account, on_delete=models.DO_NOTHING, db_constraint=False,
+                                related_name='logs', db_index=False)
+    destination = models.ForeignKey(Destination, on_delete=models.DO_NOTHING, db_constraint=False,
+                                    related_name='logs', db_index=False)
     received_timestamp = models.DateTimeField(auto_now_add=True)
     processed_timestamp = models.DateTimeField(null=True, blank=True)
-    received_data = models.JSONField()
     status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    attempt = models.PositiveSmallIntegerField(default=1)
+    batch_id = models.UUIDField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-received_timestamp", "-id"]),  # Admin listing, newest first
+            models.Index(fields=["account", "-received_timestamp", "-id"]),  # Account scoped listing
+            models.Index(fields=["destination", "status", "-received_timestamp", "-id"]),  # Destination and status filters
+        ]
 
     def __str__(self):
-        return f"Event {self.event_id} - Status {self.status}"
\ No newline at end of file
+        return f"Event {self.event.event_id} - Status {self.status}"
+
+class DeliveryStat(models.Model):
+    """Delivery counters and a latency histogram of one destination over one minute or hour."""
+    GRANULARITY_CHOICES = [
+        ("minute", "Minute"),
+        ("hour", "Hour"),
+    ]
+
+    # Rows of a deleted account or destination are removed by ``purge_deleted_rows``.
+    account = models.ForeignKey(Account, on_delete=models.DO_NOTHING, db_constraint=False,
+                                related_name='delivery_stats', db_index=False)
+    destination = models.ForeignKey(Destination, on_delete=models.DO_NOTHING, db_constraint=False,
+                                    related_name='delivery_stats', db_index=False)
+    granularity = models.CharField(max_length=6, choices=GRANULARITY_CHOICES)
+    bucket = models.DateTimeField()  # Start of the minute or hour
+    success_count = models.PositiveIntegerField(default=0)
+    failure_count = models.PositiveIntegerField(default=0)
+    deferred_count = models.PositiveIntegerField(default=0)
+    latency_total_ms = models.FloatField(default=0)
+    latency_histogram = models.JSONField(default=list)  # Counts per ``api.stats.LATENCY_BUCKETS_MS`` bound
+
+    class Meta:
+        unique_together = ("destination", "granularity", "bucket")
+        indexes = [
+            models.Index(fields=["account", "granularity", "bucket"]),
+        ]
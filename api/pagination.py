@@ -0,0 +1,184 @@
+import base64
+import json
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over ``(ordering field, id)``.
+
+    The cursor carries the ordering value and id of the row at the edge of
+    the current page, and the next page is read with a range condition on
+    that pair. A page therefore costs the same whatever its depth, and no
+    COUNT or OFFSET query is ever issued. The ordering field comes from the
+    view's ``OrderingFilter`` and must be listed in ``view.keyset_fields``;
+    NULLs sort below every value.
+    """
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_page_size(self, request):
+        page_size = getattr(settings, "LOG_PAGE_SIZE", 100)
+        max_page_size = getattr(settings, "LOG_MAX_PAGE_SIZE", 1000)
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return page_size
+        return max(1, min(requested, max_page_size))
+
+    def get_ordering(self, request, queryset, view):
+        """``(field, descending)`` taken from the view's ordering filter."""
+        ordering = None
+        for backend in getattr(view, "filter_backends", []):
+            if issubclass(backend, OrderingFilter):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+        ordering = ordering or getattr(view, "ordering", None) or ["-id"]
+        term = ordering[0] if isinstance(ordering, (list, tuple)) else ordering
+        field = term.lstrip("-")
+        if field not in getattr(view, "keyset_fields", [field]):
+            field, term = "id", "-id"
+        return field, term.startswith("-")
+
+    def encode_cursor(self, value, pk, reverse):
+        if hasattr(value, "isoformat"):
+            value = value.isoformat()
+        raw = json.dumps({"v": value, "id": pk, "r": int(reverse)}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4))
+            cursor = json.loads(raw)
+            value = cursor["v"]
+            if isinstance(value, str) and self.field != "id":
+                value = parse_datetime(value)
+            return value, int(cursor["id"]), bool(cursor["r"])
+        except (ValueError, KeyError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def order_by(self, queryset, descending):
+        if self.field == "id":
+            return queryset.order_by("-id" if descending else "id")
+        if not self.nullable:
+            # A plain ORDER BY lets the database walk an index on the field.
+            return queryset.order_by(*(f"-{name}" if descending else name
+                                       for name in (self.field, "id")))
+        if descending:
+            return queryset.order_by(F(self.field).desc(nulls_last=True), "-id")
+        return queryset.order_by(F(self.field).asc(nulls_first=True), "id")
+
+    def after(self, value, pk, descending):
+        """Rows strictly after ``(value, pk)`` in the given direction."""
+        op = "lt" if descending else "gt"
+        same_id = Q(**{f"id__{op}": pk})
+        if self.field == "id":
+            return same_id
+        if not self.nullable:
+            return Q(**{f"{self.field}__{op}": value}) | (Q(**{self.field: value}) & same_id)
+        if value is None:
+            tie = Q(**{f"{self.field}__isnull": True}) & same_id
+            return tie if descending else tie | Q(**{f"{self.field}__isnull": False})
+        beyond = Q(**{f"{self.field}__{op}": value})
+        if descending:
+            beyond |= Q(**{f"{self.field}__isnull": True})
+        return beyond | (Q(**{self.field: value}) & same_id)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.field, self.descending = self.get_ordering(request, queryset, view)
+        self.nullable = queryset.model._meta.get_field(self.field).null
+        cursor = self.decode_cursor(request)
+        reverse = cursor[2] if cursor else False
+
+        direction = self.descending != reverse
+        queryset = self.order_by(queryset, direction)
+        if cursor:
+            queryset = queryset.filter(self.after(cursor[0], cursor[1], direction))
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = cursor is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.page = rows
+        return rows
+
+    def _link(self, row, reverse):
+        url = self.request.build_absolute_uri()
+        if isinstance(row, dict):  # Rows of a .values() queryset
+            value, pk = row[self.field], row["id"]
+        else:
+            value, pk = getattr(row, self.field), row.pk
+        cursor = self.encode_cursor(value, pk, reverse)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self._link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self._link(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+class OptionalPageNumberPagination(PageNumberPagination):
+    """
+    Page-number pagination that clients opt into with ``?page=`` or
+    ``?page_size=``. Requests without either keep receiving the plain,
+    unpaginated list.
+    """
+    page_size_query_param = "page_size"
+
+    def get_page_size(self, request):
+        page_size = getattr(settings, "LIST_PAGE_SIZE", 100)
+        max_page_size = getattr(settings, "LIST_MAX_PAGE_SIZE", 1000)
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return page_size
+        return max(1, min(requested, max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.page_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
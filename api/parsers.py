@@ -0,0 +1,93 @@
+import io
+import json
+from django.conf import settings
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.utils.json import strict_constant
+
+try:
+    import orjson
+except ImportError:  # The stdlib parser is used instead
+    orjson = None
+
+# orjson reads integers beyond 64 bits as floats; bodies that may hold one
+# (any run of 19+ digits) are left to the stdlib parser, which keeps them exact.
+# Mapping digits to "0" and everything else to " " makes the check a plain
+# substring search, far cheaper than a regular expression over the body.
+_DIGITS = bytes(ord("0") if chr(byte) in "0123456789" else ord(" ") for byte in range(256))
+_LONG_NUMBER = b"0" * 19
+
+
+def loads(data):
+    """
+    Parse UTF-8 JSON ``data`` with orjson when possible, else with the
+    stdlib. Invalid input is always re-parsed by the stdlib, so errors
+    carry the same messages whichever parser is installed.
+    """
+    if orjson is not None and _LONG_NUMBER not in data.translate(_DIGITS):
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data, parse_constant=strict_constant)
+
+
+class FastJSONParser(JSONParser):
+    """
+    ``JSONParser`` backed by orjson when it is installed. Like DRF's, it
+    rejects ``NaN`` and ``Infinity``, and reports errors as
+    ``JSON parse error - ...``. Bodies in a charset other than UTF-8 go
+    through DRF's parser.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace("_", "-") not in ("utf-8", "utf8"):
+            return super().parse(stream, media_type, parser_context)
+        data = stream.read()
+        try:
+            return loads(data)
+        except (ValueError, UnicodeDecodeError):
+            # DRF's parser raises the ParseError with its usual message.
+            return super().parse(io.BytesIO(data), media_type, parser_context)
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parses newline-delimited JSON lazily. ``request.data`` becomes an
+    iterator of ``(line_number, value, error)`` tuples that reads the
+    request stream one line at a time, so memory stays bounded by the
+    longest line rather than by the size of the upload.
+    """
+    media_type = "application/x-ndjson"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if stream is None:
+            return iter(())
+        return iter_ndjson(stream, encoding)
+
+
+def iter_ndjson(stream, encoding="utf-8"):
+    """Yield ``(line_number, value, error)`` for each non-blank line of ``stream``."""
+    max_line = getattr(settings, "INGEST_NDJSON_MAX_LINE_BYTES", 1024 * 1024)
+    line_number = 0
+    while True:
+        line = stream.readline(max_line + 1)
+        if not line:
+            return
+        line_number += 1
+        if len(line) > max_line and not line.endswith(b"\n"):
+            # Drain the remainder of the oversized line before moving on.
+            while line and not line.endswith(b"\n"):
+                line = stream.readline(max_line + 1)
+            yield line_number, None, "Line exceeds maximum length"
+            continue
+        if not line.strip():
+            continue
+        try:
+            value = loads(line) if encoding.lower() in ("utf-8", "utf8") else json.loads(line.decode(encoding))
+            yield line_number, value, None
+        except (ValueError, UnicodeDecodeError) as exc:
+            yield line_number, None, f"JSON parse error - {exc}"
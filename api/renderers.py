@@ -0,0 +1,40 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # The stdlib renderer is used instead
+    orjson = None
+
+_encoder = JSONEncoder()
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    ``JSONRenderer`` backed by orjson when it is installed.
+
+    Types orjson does not handle itself (Decimals, lazy strings, querysets)
+    and datetimes go through DRF's own ``JSONEncoder.default``, so
+    datetimes keep the ``Z`` suffix and Decimals render as numbers, exactly
+    as before. Documents orjson refuses, such as integers beyond 64 bits,
+    and indented, non-compact or ASCII-only output fall back to the stdlib
+    renderer. Two differences remain: floats in exponent form are written
+    as ``1e16`` rather than ``1e+16``, and NaN or infinite floats become
+    ``null`` instead of failing the request.
+    """
+    options = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if orjson is None or self.ensure_ascii or not self.compact \
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            content = orjson.dumps(data, default=_encoder.default, option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escaped by DRF too: both are valid JSON but end lines in JavaScript.
+        if b"\xe2\x80\xa8" in content or b"\xe2\x80\xa9" in content:
+            content = content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return content
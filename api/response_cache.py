@@ -0,0 +1,96 @@
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import urlencode
+from rest_framework.response import Response
+from api.access import get_access_scope, get_user_access_scope
+from api.generations import GLOBAL_SCOPE, account_scope, get_generations, user_scope
+
+
+def cache_scopes(access):
+    """
+    Scopes whose generations a user's list responses depend on: the user
+    and every account they can see, or the global scope for superusers and
+    admins, who see every account.
+    """
+    if access.sees_all_accounts:
+        return [user_scope(access.user_id), GLOBAL_SCOPE]
+    return [user_scope(access.user_id)] + [account_scope(account_id) for account_id in sorted(access.account_ids)]
+
+
+def list_cache_key(prefix, user, params="", access=None):
+    """``<prefix>_<user id>_<params>_v<generations>`` for the user's current scopes."""
+    generations = get_generations(cache_scopes(access or get_user_access_scope(user)))
+    version = ".".join(str(generations[scope]) for scope in sorted(generations))
+    return f"{prefix}_{user.id}_{params}_v{hashlib.blake2b(version.encode(), digest_size=8).hexdigest()}"
+
+
+def make_etag(content):
+    return '"%s"' % hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def etag_matches(request, etag):
+    header = request.headers.get("If-None-Match", "")
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+def not_modified(etag):
+    response = HttpResponseNotModified()
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, no-cache"
+    return response
+
+
+class CachedListMixin:
+    """
+    Caches the rendered JSON bytes of a viewset's ``list`` response.
+
+    The key is ``<response_cache_prefix>_<user id>_<sorted query params>``
+    followed by the generations of the user's scopes, so pages and filters
+    are cached separately per user, and a write that bumps one of those
+    generations retires the key without touching other tenants. A hit is
+    served without touching the database or the serializer, and every
+    list response carries an ETag: a request whose ``If-None-Match``
+    matches gets an empty 304.
+    """
+    response_cache_prefix = None
+    response_cache_timeout_setting = "RESPONSE_CACHE_TIMEOUT"
+
+    def get_response_cache_key(self, request):
+        renderer = getattr(request, "accepted_renderer", None)
+        if renderer is None or renderer.format != "json":
+            return None  # The browsable API is rendered per request
+        params = urlencode(sorted(request.query_params.lists()), doseq=True)
+        return list_cache_key(self.response_cache_prefix, request.user, params,
+                              access=get_access_scope(request))
+
+    def list(self, request, *args, **kwargs):
+        key = self.get_response_cache_key(request)
+        cached = cache.get(key) if key else None
+        if cached is not None:
+            content, content_type, etag = cached
+            if etag_matches(request, etag):
+                return not_modified(etag)
+            response = HttpResponse(content, content_type=content_type)
+            response["ETag"] = etag
+            response["Cache-Control"] = "private, no-cache"
+            return response
+        self.response_cache_key = key
+        return super().list(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        key = getattr(self, "response_cache_key", None)
+        if not key or not isinstance(response, Response) or response.status_code != 200:
+            return response
+        response.render()
+        etag = make_etag(response.content)
+        timeout = getattr(settings, self.response_cache_timeout_setting, 300)
+        cache.set(key, (response.content, response["Content-Type"], etag), timeout=timeout)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, no-cache"
+        return response
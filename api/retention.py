@@ -0,0 +1,79 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from django.utils.timezone import now
+from api.models import Account, DeliveryStat, Event, Log
+
+
+def retention_days(account):
+    if account.log_retention_days is not None:
+        return account.log_retention_days
+    return getattr(settings, "LOG_RETENTION_DAYS", 30)
+
+
+def retention_cutoff(account, at=None):
+    """Logs received before this moment have expired for ``account``."""
+    return (at or now()) - timedelta(days=retention_days(account))
+
+
+def delete_in_chunks(queryset, chunk_size=None, pause=None):
+    """
+    Delete the rows of ``queryset`` one chunk of primary keys at a time.
+
+    Each chunk is picked by keyset on the primary key, after the last key
+    of the previous chunk, and removed with its own short DELETE over at
+    most ``chunk_size`` keys, so no statement holds locks for long or piles
+    up a large WAL, and gaps in the ids cost nothing. The ``pause`` between
+    chunks leaves room for the regular write traffic. Returns the number
+    of rows deleted.
+    """
+    chunk_size = chunk_size or getattr(settings, "LOG_PURGE_CHUNK_SIZE", 1000)
+    pause = getattr(settings, "LOG_PURGE_CHUNK_PAUSE", 0.05) if pause is None else pause
+    deleted = 0
+    last = None
+    while True:
+        chunk = queryset if last is None else queryset.filter(pk__gt=last)
+        pks = list(chunk.order_by("pk").values_list("pk", flat=True)[:chunk_size])
+        if not pks:
+            break
+        count, _ = queryset.filter(pk__in=pks).delete()
+        deleted += count
+        last = pks[-1]
+        if len(pks) < chunk_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return deleted
+
+
+def unreferenced_events(**filters):
+    """Events matching ``filters`` that no log row points at any more."""
+    return Event.objects.filter(**filters).filter(~Exists(Log.objects.filter(event=OuterRef("pk"))))
+
+
+def purge_expired(account, at=None):
+    """
+    Delete the logs of ``account`` past its retention, then their orphaned
+    events. Hourly delivery stats follow the same retention; minute stats
+    only live for ``DELIVERY_STATS_MINUTE_RETENTION_DAYS``.
+    """
+    cutoff = retention_cutoff(account, at)
+    logs = delete_in_chunks(Log.objects.filter(account_id=account.id, received_timestamp__lt=cutoff))
+    events = delete_in_chunks(unreferenced_events(account_id=account.id, received_timestamp__lt=cutoff))
+    minute_cutoff = (at or now()) - timedelta(days=getattr(settings, "DELIVERY_STATS_MINUTE_RETENTION_DAYS", 7))
+    stats = DeliveryStat.objects.filter(account_id=account.id)
+    delete_in_chunks(stats.filter(granularity="hour", bucket__lt=cutoff))
+    delete_in_chunks(stats.filter(granularity="minute", bucket__lt=minute_cutoff))
+    return logs, events
+
+
+def purge_orphaned_rows():
+    """
+    Delete the logs, events and stats whose account no longer exists. The
+    purge queued when an account is deleted can run before tasks that were
+    already queued for it, and nothing else would ever remove their rows.
+    """
+    missing_account = ~Exists(Account.objects.filter(pk=OuterRef("account_id")))
+    return tuple(delete_in_chunks(model.objects.filter(missing_account))
+                 for model in (Log, Event, DeliveryStat))
@@ -0,0 +1,43 @@
+import random
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from django.conf import settings
+
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+
+def max_attempts():
+    return getattr(settings, "DELIVERY_MAX_ATTEMPTS", 5)
+
+
+def backoff_delay(attempt):
+    """
+    Exponential backoff with full jitter: a random delay between zero and
+    ``base * 2 ** (attempt - 1)`` seconds, capped at the maximum delay.
+    """
+    base = getattr(settings, "DELIVERY_RETRY_BASE_DELAY", 5)
+    cap = getattr(settings, "DELIVERY_RETRY_MAX_DELAY", 3600)
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+def parse_retry_after(value):
+    """Return the seconds asked for by a ``Retry-After`` header, or ``None``."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return int(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def retry_delay(attempt, retry_after=None):
+    """Seconds to wait before attempt ``attempt + 1``; ``Retry-After`` wins when given."""
+    if retry_after is not None:
+        return min(retry_after, getattr(settings, "DELIVERY_RETRY_MAX_DELAY", 3600))
+    return backoff_delay(attempt)
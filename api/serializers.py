@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Account,AccountMember,Role,Destination,Log
+from .account_cache import get_account_by_token
 from django.utils.timezone import now
 import json
 
@@ -59,11 +60,22 @@ class DestinationSerializer(serializers.ModelSerializer):
         if not value.startswith(("http://", "https://")):
             raise serializers.ValidationError("Invalid URL. Must start with http:// or https://")
         return value
+
+    def validate(self, attrs):
+        """Micro-batches are sent as a JSON body, which GET destinations cannot carry."""
+        batch_enabled = attrs.get("batch_enabled", getattr(self.instance, "batch_enabled", False))
+        http_method = attrs.get("http_method", getattr(self.instance, "http_method", None))
+        if batch_enabled and http_method == "GET":
+            raise serializers.ValidationError({"batch_enabled": "Batching is not available for GET destinations."})
+        if attrs.get("batch_max_events") == 0:
+            raise serializers.ValidationError({"batch_max_events": "Must be at least 1."})
+        return attrs
     
     def create(self, validated_data):
         request = self.context.get('request')
         user = request.user if request and request.user.is_authenticated else None
         validated_data['created_by'] = user
+        validated_data['updated_by'] = user  # Required on destinations
         return super().create(validated_data)
     
     def update(self, instance, validated_data):
@@ -73,10 +85,24 @@ class DestinationSerializer(serializers.ModelSerializer):
         return super().update(instance, validated_data)
 
 class LogSerializer(serializers.ModelSerializer):
-    
+    event_id = serializers.CharField(source="event.event_id", read_only=True)
+    received_data = serializers.JSONField(source="event.received_data", read_only=True)
+
     class Meta:
         model = Log
-        fields = "__all__"
+        fields = ["id", "event_id", "received_timestamp", "processed_timestamp", "received_data",
+                  "status", "attempt", "batch_id", "account", "destination"]
+
+
+def resolve_account(app_secret_token):
+    """
+    Return the cached ``AccountRecord`` owning ``app_secret_token`` or
+    raise a ValidationError.
+    """
+    account = get_account_by_token(app_secret_token) if app_secret_token else None
+    if account is None:
+        raise serializers.ValidationError({"success": False, "message": "Unauthenticated"})
+    return account
 
 
 class IncomingDataSerializer(serializers.Serializer):
@@ -95,11 +121,13 @@ class IncomingDataSerializer(serializers.Serializer):
         if not event_id:
             raise serializers.ValidationError({"success": False, "message": "Invalid Data"})
 
-        try:
-            account = Account.objects.get(app_secret_token=app_secret_token)
-        except Account.DoesNotExist:
-            raise serializers.ValidationError({"success": False, "message": "Unauthenticated"})
-
-        attrs["account"] = account
+        attrs["account"] = resolve_account(app_secret_token)
         attrs["event_id"] = event_id
-        return attrs
\ No newline at end of file
+        return attrs
+
+
+class IncomingEventSerializer(serializers.Serializer):
+    """A single ``{event_id, data}`` item of a batch ingest request."""
+
+    event_id = serializers.CharField(max_length=255)
+    data = serializers.JSONField()
@@ -2,8 +2,16 @@ from django.db.models.signals import post_migrate
 from django.dispatch import receiver
 from .models import Role
 from django.db.models.signals import post_save, post_delete
-from .models import Account,AccountMember
-from django.core.cache import cache
+from .models import Account,AccountMember,Destination
+from django.contrib.auth import get_user_model
+from .generations import GLOBAL_SCOPE, account_scope, bump_generations, user_scope
+from django.db import transaction
+from .account_cache import invalidate_account_token
+from .tasks import purge_deleted_rows
+from rest_framework.authtoken.models import Token
+from Users.authentication import invalidate_auth_token
+
+User = get_user_model()
 
 @receiver(post_migrate)
 def create_default_roles(sender, **kwargs):
@@ -21,18 +29,39 @@ def create_default_roles(sender, **kwargs):
     print("✅ Default roles ensured in the database.")
 
 
-CACHE_KEYS = "accounts_list_keys"  
-
-def delete_cache_keys():
-    keys = cache.get(CACHE_KEYS) or set()  
-    for key in keys:
-        cache.delete(key)
-    cache.delete(CACHE_KEYS)
-
 @receiver([post_save, post_delete], sender=Account)
-def clear_account_cache(sender, **kwargs):
-    delete_cache_keys()  
+def clear_account_cache(sender, instance, **kwargs):
+    invalidate_account_token(instance.app_secret_token)
+    bump_generations(account_scope(instance.id), GLOBAL_SCOPE)
 
 @receiver([post_save, post_delete], sender=AccountMember)
-def clear_account_member_cache(sender, **kwargs):
-    delete_cache_keys() 
\ No newline at end of file
+def clear_account_member_cache(sender, instance, **kwargs):
+    # The member's visible accounts changed, and so did the account's member list.
+    bump_generations(user_scope(instance.user_id), account_scope(instance.account_id), GLOBAL_SCOPE)
+
+@receiver([post_save, post_delete], sender=Destination)
+def clear_destination_cache(sender, instance, **kwargs):
+    bump_generations(account_scope(instance.account_id), GLOBAL_SCOPE)
+
+@receiver([post_save, post_delete], sender=User)
+def clear_user_cache(sender, instance, **kwargs):
+    # A change to is_superuser changes what the user sees and their access scope.
+    # Also revokes the user's cached tokens in every process.
+    bump_generations(user_scope(instance.id))
+
+@receiver(post_delete, sender=Token)
+def clear_auth_token_cache(sender, instance, **kwargs):
+    invalidate_auth_token(instance.key)
+    bump_generations(user_scope(instance.user_id))
+
+
+@receiver(post_delete, sender=Account)
+def purge_account_rows(sender, instance, **kwargs):
+    """Logs and events are not cascaded; hand them to the chunked purge task."""
+    account_id = instance.id  # Cleared on the instance once the delete completes
+    transaction.on_commit(lambda: purge_deleted_rows.delay(account_id=account_id))
+
+@receiver(post_delete, sender=Destination)
+def purge_destination_rows(sender, instance, **kwargs):
+    destination_id = instance.id
+    transaction.on_commit(lambda: purge_deleted_rows.delay(destination_id=destination_id))
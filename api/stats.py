@@ -0,0 +1,182 @@
+from bisect import bisect_left
+from functools import reduce
+from operator import or_
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import is_aware, make_aware, now
+from rest_framework.exceptions import ValidationError
+from api.models import DeliveryStat
+
+# Upper bounds, in milliseconds, of the latency histogram buckets; the last one is open-ended.
+LATENCY_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, float("inf")]
+
+GRANULARITIES = ["minute", "hour"]
+
+COUNTERS = {
+    "success": "success_count",
+    "failed": "failure_count",
+    "retrying": "failure_count",
+    "deferred": "deferred_count",
+}
+
+
+def truncate(at, granularity):
+    """Start of the minute or hour ``at`` falls in."""
+    if granularity == "hour":
+        return at.replace(minute=0, second=0, microsecond=0)
+    return at.replace(second=0, microsecond=0)
+
+
+def empty_totals():
+    return {
+        "success_count": 0,
+        "failure_count": 0,
+        "deferred_count": 0,
+        "latency_total_ms": 0.0,
+        "latency_histogram": [0] * len(LATENCY_BUCKETS_MS),
+    }
+
+
+def totals_of(stat):
+    """Counters of a ``DeliveryStat`` row as a totals dict."""
+    totals = {field: getattr(stat, field) for field in empty_totals()}
+    histogram = list(stat.latency_histogram or [])
+    totals["latency_histogram"] = histogram + [0] * (len(LATENCY_BUCKETS_MS) - len(histogram))
+    return totals
+
+
+def add_totals(totals, other):
+    for field in ["success_count", "failure_count", "deferred_count", "latency_total_ms"]:
+        totals[field] += other[field]
+    for index, count in enumerate(other["latency_histogram"]):
+        totals["latency_histogram"][index] += count
+    return totals
+
+
+def record_deliveries(entries):
+    """
+    Fold ``(log, latency_seconds)`` pairs into the minute and hour
+    ``DeliveryStat`` rows of their destinations. Must run inside a
+    transaction: the rows are created if missing, locked, and updated in
+    one ``bulk_update``, so concurrent workers never lose increments.
+    Logs without a ``processed_timestamp`` were never attempted and are
+    skipped.
+    """
+    pending = {}
+    for log, latency in entries:
+        if log.processed_timestamp is None:
+            continue
+        for granularity in GRANULARITIES:
+            key = (log.destination_id, granularity, truncate(log.processed_timestamp, granularity))
+            account_id, totals = pending.setdefault(key, (log.account_id, empty_totals()))
+            totals[COUNTERS[log.status]] += 1
+            if latency is not None:
+                milliseconds = latency * 1000
+                totals["latency_total_ms"] += milliseconds
+                totals["latency_histogram"][bisect_left(LATENCY_BUCKETS_MS, milliseconds)] += 1
+    if not pending:
+        return
+
+    DeliveryStat.objects.bulk_create(
+        [DeliveryStat(account_id=account_id, destination_id=destination_id, granularity=granularity,
+                      bucket=bucket, latency_histogram=[0] * len(LATENCY_BUCKETS_MS))
+         for (destination_id, granularity, bucket), (account_id, _) in sorted(pending.items())],
+        ignore_conflicts=True,
+    )
+    match = reduce(or_, (Q(destination_id=destination_id, granularity=granularity, bucket=bucket)
+                         for destination_id, granularity, bucket in pending))
+    # Rows are inserted and locked in one fixed order so concurrent flushes cannot deadlock.
+    stats = list(DeliveryStat.objects.select_for_update().filter(match).order_by("pk"))
+    for stat in stats:
+        _, totals = pending[(stat.destination_id, stat.granularity, stat.bucket)]
+        for field, value in add_totals(totals_of(stat), totals).items():
+            setattr(stat, field, value)
+    DeliveryStat.objects.bulk_update(stats, list(empty_totals()))
+
+
+def percentile(histogram, fraction):
+    """
+    Latency, in milliseconds, below which ``fraction`` of the calls in
+    ``histogram`` completed, interpolated linearly inside its bucket.
+    """
+    total = sum(histogram)
+    if not total:
+        return None
+    rank = fraction * total
+    seen = 0
+    for index, count in enumerate(histogram):
+        if count and seen + count >= rank:
+            lower = LATENCY_BUCKETS_MS[index - 1] if index else 0
+            upper = LATENCY_BUCKETS_MS[index]
+            if upper == float("inf"):
+                return lower
+            return round(lower + (upper - lower) * (rank - seen) / count, 1)
+        seen += count
+    return None
+
+
+def summarize(totals):
+    """Public figures of summed counters: rates and latency percentiles."""
+    histogram = totals["latency_histogram"]
+    delivered = totals["success_count"] + totals["failure_count"]
+    timed = sum(histogram)
+    return {
+        "success": totals["success_count"],
+        "failed": totals["failure_count"],
+        "deferred": totals["deferred_count"],
+        "success_rate": round(totals["success_count"] / delivered, 4) if delivered else None,
+        "latency_avg_ms": round(totals["latency_total_ms"] / timed, 1) if timed else None,
+        "latency_p50_ms": percentile(histogram, 0.5),
+        "latency_p95_ms": percentile(histogram, 0.95),
+    }
+
+
+def stats_series(queryset):
+    """Per-bucket figures of a ``DeliveryStat`` queryset, summed across its destinations."""
+    buckets = {}
+    for stat in queryset.order_by("bucket"):
+        add_totals(buckets.setdefault(stat.bucket, empty_totals()), totals_of(stat))
+    return [{"bucket": bucket, **summarize(totals)} for bucket, totals in buckets.items()]
+
+
+def stats_summary(queryset, group_by=None):
+    """Figures of a whole ``DeliveryStat`` queryset, optionally also per ``group_by`` column."""
+    overall = empty_totals()
+    groups = {}
+    for stat in queryset:
+        totals = totals_of(stat)
+        add_totals(overall, totals)
+        if group_by:
+            add_totals(groups.setdefault(getattr(stat, group_by), empty_totals()), totals)
+    summary = summarize(overall)
+    if group_by:
+        summary["by_" + group_by.removesuffix("_id")] = {key: summarize(value) for key, value in groups.items()}
+    return summary
+
+
+def stats_window(params):
+    """
+    ``(granularity, since, until)`` from the ``granularity``, ``since`` and
+    ``until`` query parameters; the default is the hourly rollup of the
+    last ``DELIVERY_STATS_DEFAULT_WINDOW_HOURS`` hours.
+    """
+    granularity = params.get("granularity", "hour")
+    if granularity not in GRANULARITIES:
+        raise ValidationError({"granularity": f"Use one of: {', '.join(GRANULARITIES)}."})
+    bounds = {}
+    for name in ["since", "until"]:
+        if not params.get(name):
+            continue
+        try:
+            value = parse_datetime(params[name])
+        except ValueError:
+            value = None
+        if value is None:
+            raise ValidationError({name: "Must be an ISO 8601 timestamp."})
+        bounds[name] = value if is_aware(value) else make_aware(value)
+    until = bounds.get("until", now())
+    hours = getattr(settings, "DELIVERY_STATS_DEFAULT_WINDOW_HOURS", 24)
+    since = bounds.get("since", until - timedelta(hours=hours))
+    return granularity, truncate(since, granularity), until
@@ -1,34 +1,299 @@
+import time
+import uuid
+import functools
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from celery import shared_task
 import requests
+from django.conf import settings
 from django.utils.timezone import now
-from api.models import Log, Destination
+from api.models import Account, DeliveryStat, Event, Log, Destination
+from api.http_pool import session_pool, get_timeout
+from api.retry import RETRYABLE_STATUS_CODES, backoff_delay, max_attempts, parse_retry_after, retry_delay
+from api.circuit import CircuitBreaker
+from api.batching import MicroBatcher
+from api.log_writer import log_writer
+from api.retention import delete_in_chunks, purge_expired, purge_orphaned_rows, retention_cutoff
+from api.archive import archive_account_logs, log_archive
 
-@shared_task
-def send_data_to_destinations(account_id, event_id, data):
-    """Send incoming data to all destinations asynchronously."""
-    
-    destinations = Destination.objects.filter(account_id=account_id)
-    
-    for destination in destinations:
-        headers = destination.headers
-        headers["CL-X-EVENT-ID"] = event_id  
-        
-        try:
+DeliveryResult = namedtuple("DeliveryResult", ["status", "retryable", "retry_after", "latency"])
+
+# Returned without any HTTP call while a destination's circuit breaker is open.
+DEFERRED = DeliveryResult("deferred", True, None, None)
+
+
+def send_request(destination, headers, data):
+    """Send ``data`` to a destination and return a ``DeliveryResult``."""
+    started = time.monotonic()
+    try:
+        with session_pool.lease(destination.url) as session:
             if destination.http_method == "GET":
-                response = requests.get(destination.url, params=data, headers=headers)
-            else:  
-                response = requests.request(destination.http_method, destination.url, json=data, headers=headers)
-            
-            status = "success" if response.status_code in [200, 201, 202] else "failed"
+                response = session.get(destination.url, params=data, headers=headers, timeout=get_timeout())
+            else:
+                response = session.request(destination.http_method, destination.url, json=data, headers=headers,
+                                           timeout=get_timeout())
+
+    except requests.RequestException:
+        return DeliveryResult("failed", True, None, time.monotonic() - started)
+
+    latency = time.monotonic() - started
+    if response.status_code in [200, 201, 202]:
+        return DeliveryResult("success", False, None, latency)
+    return DeliveryResult("failed", response.status_code in RETRYABLE_STATUS_CODES,
+                          parse_retry_after(response.headers.get("Retry-After")), latency)
+
+
+def deliver(destination, event_id, data):
+    """Send one event to one destination."""
+    headers = dict(destination.headers or {})
+    headers["CL-X-EVENT-ID"] = str(event_id)
+    return send_request(destination, headers, data)
+
+
+def deliver_batch(destination, batch_id, events):
+    """
+    Send ``(event_id, data)`` pairs to one destination as a single JSON
+    array. Event ids travel in the body instead of ``CL-X-EVENT-ID``.
+    """
+    headers = dict(destination.headers or {})
+    headers["CL-X-BATCH-ID"] = str(batch_id)
+    body = [{"event_id": event_id, "data": data} for event_id, data in events]
+    return send_request(destination, headers, body)
+
+
+def guarded(send, destination, *args):
+    """Call ``send`` unless the destination's circuit breaker is open."""
+    if not CircuitBreaker(destination.id).allow_request():
+        return DEFERRED
+    return send(destination, *args)
 
-        except requests.RequestException:
-            status = "failed"
 
-        Log.objects.create(
-            account_id=account_id,
+def guarded_deliver(destination, event_id, data):
+    return guarded(deliver, destination, event_id, data)
+
+
+def iter_deliveries(destinations, event_id, data, concurrency):
+    """
+    Deliver to every destination, at most ``concurrency`` at a time, and
+    yield ``(destination, result)`` as each delivery completes so that one
+    slow endpoint does not hold back the results of the others.
+    """
+    workers = min(concurrency, len(destinations))
+    if workers <= 1:
+        for destination in destinations:
+            yield destination, guarded_deliver(destination, event_id, data)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(guarded_deliver, destination, event_id, data): destination
+                   for destination in destinations}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def record_attempt(destination, events, result, attempt, batch_id=None):
+    """
+    Log one delivery attempt with a row per ``Event``. A retryable failure
+    below the attempt limit is logged as "retrying" and a later attempt is
+    scheduled on the broker with a countdown, so no worker thread waits
+    for the backoff to elapse. A delivery short-circuited by an open
+    breaker is logged as "deferred" and rescheduled, with the same
+    attempt number, no sooner than ``CIRCUIT_COOLDOWN_SECONDS`` later:
+    a deferral never uses up an attempt. A micro-batch is retried as a whole.
+    """
+    breaker = CircuitBreaker(destination.id)
+    deferred = result is DEFERRED
+    if not deferred:
+        # A non-retryable answer such as a 404 still shows the endpoint is up.
+        breaker.record(result.status == "success" or not result.retryable, result.latency)
+
+    if deferred:
+        will_retry, status = True, "deferred"
+    else:
+        will_retry = result.status != "success" and result.retryable and attempt < max_attempts()
+        status = "retrying" if will_retry else result.status
+    processed_timestamp = now()
+    for event in events:
+        log_writer.add(Log(
+            event=event,
+            account_id=event.account_id,
             destination=destination,
-            event_id=event_id,
-            received_data=data,
-            processed_timestamp=now(),
-            status=status
+            processed_timestamp=processed_timestamp,
+            status=status,
+            attempt=attempt,
+            batch_id=batch_id,
+        ), latency=result.latency)
+    if not will_retry:
+        return
+    if deferred:
+        # A half-open breaker reports zero seconds; wait a full cooldown anyway.
+        countdown = max(breaker.retry_in(), breaker.cooldown) + backoff_delay(attempt)
+        next_attempt = attempt
+    else:
+        countdown = retry_delay(attempt, result.retry_after)
+        next_attempt = attempt + 1
+    if batch_id is None:
+        event = events[0]
+        retry_delivery.apply_async(
+            args=[event.account_id, destination.id, event.event_id, event.received_data, next_attempt],
+            countdown=countdown,
+        )
+    else:
+        retry_micro_batch.apply_async(
+            args=[destination.id, str(batch_id), [event.pk for event in events], next_attempt],
+            countdown=countdown,
         )
+
+
+def flushes_logs(task):
+    """Flush the rows a task buffered in ``log_writer`` once it returns or fails."""
+    @functools.wraps(task)
+    def wrapper(*args, **kwargs):
+        try:
+            return task(*args, **kwargs)
+        finally:
+            log_writer.flush_if_due()
+    return wrapper
+
+
+def get_event(account_id, event_id, data):
+    """The stored ``Event`` for an incoming event, created on first delivery."""
+    event, _ = Event.objects.get_or_create(account_id=account_id, event_id=event_id,
+                                           defaults={"received_data": data})
+    return event
+
+
+def add_to_micro_batch(destination, event):
+    """Queue an event for a batch-enabled destination and arrange its flush."""
+    batcher = MicroBatcher(destination.id, destination.batch_max_events, destination.batch_max_wait_ms)
+    sequence, slot = batcher.add(event.pk)
+    if slot is None:
+        # The batch was sent without this event; its flush gave up waiting for it.
+        log_writer.add(Log(event=event, account_id=event.account_id, destination=destination,
+                           processed_timestamp=now(), status="failed", attempt=1))
+    elif slot == batcher.max_events:
+        flush_micro_batch.delay(destination.id, sequence)
+    elif slot == 1:
+        flush_micro_batch.apply_async(args=[destination.id, sequence],
+                                      countdown=destination.batch_max_wait_ms / 1000)
+
+
+def send_micro_batch(destination, batch_id, event_pks, attempt):
+    """Send the stored events ``event_pks`` to a destination as one batch."""
+    stored = Event.objects.in_bulk(event_pks)
+    events = [stored[pk] for pk in event_pks if pk in stored]
+    if not events:
+        return
+    result = guarded(deliver_batch, destination, batch_id,
+                     [(event.event_id, event.received_data) for event in events])
+    record_attempt(destination, events, result, attempt, batch_id=batch_id)
+
+
+@shared_task
+@flushes_logs
+def send_data_to_destinations(account_id, event_id, data, concurrency=None):
+    """Send incoming data to all destinations asynchronously."""
+
+    destinations = list(Destination.objects.filter(account_id=account_id))
+    if not destinations:
+        # Nothing to deliver; the account may also be gone, so store no event for it.
+        return
+    if concurrency is None:
+        concurrency = getattr(settings, "DELIVERY_MAX_CONCURRENCY", 10)
+
+    event = get_event(account_id, event_id, data)
+    direct = []
+    for destination in destinations:
+        if destination.batch_enabled:
+            add_to_micro_batch(destination, event)
+        else:
+            direct.append(destination)
+
+    # Log rows are written from the task thread; only HTTP runs in the pool.
+    for destination, result in iter_deliveries(direct, event_id, data, concurrency):
+        record_attempt(destination, [event], result, attempt=1)
+
+
+@shared_task
+@flushes_logs
+def retry_delivery(account_id, destination_id, event_id, data, attempt):
+    """Re-send one event to the single destination whose delivery failed."""
+    destination = Destination.objects.filter(id=destination_id, account_id=account_id).first()
+    if destination is None:
+        return
+    record_attempt(destination, [get_event(account_id, event_id, data)],
+                   guarded_deliver(destination, event_id, data), attempt)
+
+
+@shared_task
+@flushes_logs
+def flush_micro_batch(destination_id, sequence, slots=None, passes=1):
+    """
+    Close micro-batch ``sequence`` of a destination and send it. Slots
+    whose payload was not written yet are handed to a follow-up flush, up
+    to ``MICRO_BATCH_MAX_COLLECT_PASSES`` passes in all; then they are
+    abandoned, and an event written after that is logged as failed.
+    """
+    destination = Destination.objects.filter(id=destination_id).first()
+    if destination is None:
+        return
+    batcher = MicroBatcher(destination.id, destination.batch_max_events, destination.batch_max_wait_ms)
+    if slots is None:
+        slots = batcher.close(sequence)
+        if not slots:
+            return
+    event_pks, missing = batcher.collect(sequence, slots)
+    if missing and passes < getattr(settings, "MICRO_BATCH_MAX_COLLECT_PASSES", 5):
+        flush_micro_batch.apply_async(args=[destination_id, sequence, missing, passes + 1], countdown=1)
+    elif missing:
+        event_pks += batcher.abandon(sequence, missing)
+    if event_pks:
+        send_micro_batch(destination, uuid.uuid4(), event_pks, attempt=1)
+
+
+@shared_task
+@flushes_logs
+def retry_micro_batch(destination_id, batch_id, event_pks, attempt):
+    """Re-send a failed micro-batch to its destination."""
+    destination = Destination.objects.filter(id=destination_id).first()
+    if destination is None:
+        return
+    send_micro_batch(destination, batch_id, event_pks, attempt)
+
+
+@shared_task
+def purge_expired_logs():
+    """
+    Delete the logs and archived segments of every account that are past its
+    retention period, and the rows and segments left behind by deleted accounts.
+    """
+    for account in Account.objects.only("id", "log_retention_days").iterator():
+        purge_expired(account)
+        log_archive.drop_days_before(account.id, retention_cutoff(account).date().isoformat())
+    purge_orphaned_rows()
+    archived = log_archive.account_ids()
+    for account_id in set(archived) - set(Account.objects.filter(id__in=archived).values_list("id", flat=True)):
+        log_archive.drop_account(account_id)
+
+
+@shared_task
+def archive_old_logs():
+    """Move logs past the hot window of every account into the shared archive."""
+    for account in Account.objects.only("id").iterator():
+        archive_account_logs(account)
+
+
+@shared_task
+def purge_deleted_rows(account_id=None, destination_id=None):
+    """
+    Remove, in chunks, the logs, events and stats left behind by a deleted
+    account or destination, and the archived segments of a deleted account.
+    """
+    if account_id is not None:
+        log_archive.drop_account(account_id)
+        delete_in_chunks(Log.objects.filter(account_id=account_id))
+        delete_in_chunks(Event.objects.filter(account_id=account_id))
+        delete_in_chunks(DeliveryStat.objects.filter(account_id=account_id))
+    if destination_id is not None:
+        delete_in_chunks(Log.objects.filter(destination_id=destination_id))
+        delete_in_chunks(DeliveryStat.objects.filter(destination_id=destination_id))
@@ -1,4 +1,4 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model,get_user
 from django.db import IntegrityError
 from rest_framework.test import APIClient,APITestCase
@@ -8,6 +8,8 @@ from django.urls import reverse
 from django.contrib.auth.hashers import make_password
 from django.core.cache import cache
 from api.models import Account, AccountMember
+from api.access import ADMIN_ROLE_ID, NORMAL_USER_ROLE_ID, get_user_access_scope
+from api.tests_api import LOCAL_CACHES
 
 
 User = get_user_model()
@@ -41,6 +43,7 @@ def create_account(account_name= 'Test Account',
                                  created_by=created_by)
     return acc
 
+@override_settings(CACHES=LOCAL_CACHES)
 class AccountMemberTests(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -331,4 +334,28 @@ class AccountMemberTests(TestCase):
         res = self.client.post(reverse('account_member-list'),payload, format='json')
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
         print(" ✅ Passed!")
-    
\ No newline at end of file
+    
+    def test_access_scope_is_cached_until_membership_changes(self):
+        """Test that roles are resolved once and re-read after a membership change"""
+        print("\nRunning test_access_scope_is_cached_until_membership_changes...", end="", flush=True)
+        user1 = create_super_user()
+        user2 = create_user(created_by=user1)
+        account = create_account(created_by=user1)
+        other = create_account(account_name='Other Account', created_by=user1)
+        AccountMember.objects.create(account=account, user=user2, role_id=NORMAL_USER_ROLE_ID, created_by=user1)
+        scope = get_user_access_scope(user2)
+        self.assertFalse(scope.sees_all_accounts)
+        self.assertEqual(scope.account_ids, {account.id})
+        self.assertTrue(scope.has_role(account.id, NORMAL_USER_ROLE_ID))
+        with self.assertNumQueries(0):
+            self.assertEqual(get_user_access_scope(user2), scope)
+        AccountMember.objects.create(account=other, user=user2, role_id=ADMIN_ROLE_ID, created_by=user1)
+        scope = get_user_access_scope(user2)
+        self.assertTrue(scope.is_admin)
+        self.assertEqual(scope.account_ids, {account.id, other.id})
+        token, _ = Token.objects.get_or_create(user=user2)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        res = self.client.get(reverse('account_member-list'))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.json()), 2)
+        print(" ✅ Passed!")
@@ -1,4 +1,5 @@
-from django.test import TestCase
+from unittest import mock
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model,get_user
 from django.db import IntegrityError
 from rest_framework.test import APIClient,APITestCase
@@ -7,7 +8,11 @@ from rest_framework.authtoken.models import Token
 from django.urls import reverse
 from django.contrib.auth.hashers import make_password
 from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from api.models import Account, AccountMember
+from api.response_cache import list_cache_key
+from api.tests_api import LOCAL_CACHES
 
 User = get_user_model()
 
@@ -40,6 +45,7 @@ def create_account(account_name= 'Test Account',
                                  created_by=created_by)
     return acc
 
+@override_settings(CACHES=LOCAL_CACHES)
 class AccountTests(TestCase):
     
     def setUp(self):
@@ -103,6 +109,19 @@ class AccountTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
         print(" ✅ Passed!")
 
+    def test_only_admins_can_create_destinations(self):
+        print("\nRunning test_only_admins_can_create_destinations...", end="", flush=True)
+        payload = {"account": self.account2.id, "url": "https://hooks.example.com/in",
+                   "http_method": "POST", "headers": {"X-Key": "1"}}
+        self.client.force_authenticate(user=self.user3)
+        response = self.client.post(reverse('destination-list'), payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        cache.clear()
+        self.client.force_authenticate(user=self.user2)
+        response = self.client.post(reverse('destination-list'), payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        print(" ✅ Passed!")
+
     def test_associated_user_can_update_account(self):
         print("\nRunning test_associated_user_can_update_account...", end="", flush=True)
         self.client.force_authenticate(user=self.user3)
@@ -155,7 +174,112 @@ class AccountTests(TestCase):
         self.client.force_authenticate(user=self.user2)
         response1 = self.client.get(reverse('account-list'))
         self.assertEqual(response1.status_code, status.HTTP_200_OK)
-        cached_response = cache.get(f"accounts_list_{self.user2.id}_")
+        cached_response = cache.get(list_cache_key("accounts_list", self.user2))
         self.assertIsNotNone(cached_response)
         print(" ✅ Passed!")
-    
\ No newline at end of file
+    
+    def test_cached_list_is_served_with_etag_and_304(self):
+        print("\nRunning test_cached_list_is_served_with_etag_and_304...", end="", flush=True)
+        self.client.force_authenticate(user=self.user2)
+        first = self.client.get(reverse('account-list'))
+        etag = first["ETag"]
+        with self.assertNumQueries(0):
+            second = self.client.get(reverse('account-list'))
+            not_modified = self.client.get(reverse('account-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(not_modified.content, b"")
+
+        # Writes drop the cached pages, so the next read sees the change.
+        self.account3.account_name = "Renamed"
+        self.account3.save()
+        third = self.client.get(reverse('account-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(third.status_code, status.HTTP_200_OK)
+        self.assertIn("Renamed", [account["account_name"] for account in third.json()])
+        print(" ✅ Passed!")
+
+    def test_writes_only_invalidate_affected_scopes(self):
+        print("\nRunning test_writes_only_invalidate_affected_scopes...", end="", flush=True)
+        self.client.force_authenticate(user=self.user3)
+        self.client.get(reverse('account-list'))
+        warm_key = list_cache_key("accounts_list", self.user3)
+        self.assertIsNotNone(cache.get(warm_key))
+
+        # Another tenant's account changes: user3's page stays warm.
+        self.account3.website = "https://dummy.example.com"
+        self.account3.save()
+        self.assertEqual(list_cache_key("accounts_list", self.user3), warm_key)
+
+        # user3's own account changes: the old page is no longer addressed.
+        self.account2.website = "https://bank.example.com"
+        self.account2.save()
+        self.assertNotEqual(list_cache_key("accounts_list", self.user3), warm_key)
+        response = self.client.get(reverse('account-list'))
+        self.assertEqual(response.json()[0]['website'], "https://bank.example.com")
+        print(" ✅ Passed!")
+
+    def test_token_authentication_is_cached_until_logout(self):
+        print("\nRunning test_token_authentication_is_cached_until_logout...", end="", flush=True)
+        token, _ = Token.objects.get_or_create(user=self.user3)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.client.get(reverse('account-list'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('account-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        res = self.client.post(reverse('logout'))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        response = self.client.get(reverse('account-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        # A deactivated user's cached token stops working at once.
+        token = Token.objects.create(user=self.user3)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(self.client.get(reverse('account-list')).status_code, status.HTTP_200_OK)
+        self.user3.is_active = False
+        self.user3.save()
+        response = self.client.get(reverse('account-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        # Revoked by another process: only the shared generation tells this one.
+        token, _ = Token.objects.get_or_create(user=self.user2)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(self.client.get(reverse('account-list')).status_code, status.HTTP_200_OK)
+        with mock.patch("api.signals.invalidate_auth_token"):
+            token.delete()
+        response = self.client.get(reverse('account-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        print(" ✅ Passed!")
+
+    def test_list_pagination_and_sparse_fields_are_opt_in(self):
+        print("\nRunning test_list_pagination_and_sparse_fields_are_opt_in...", end="", flush=True)
+        self.client.force_authenticate(user=self.user1)
+        response = self.client.get(reverse('account-list'))
+        self.assertEqual(len(response.json()), 3)
+        self.assertIn("website", response.json()[0])
+
+        response = self.client.get(reverse('account-list'), {"page_size": 2})
+        page = response.json()
+        self.assertEqual(page["count"], 3)
+        self.assertEqual(len(page["results"]), 2)
+        self.assertIsNotNone(page["next"])
+
+        cache.clear()  # Stay under the 5/s throttle
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('account-list'), {"fields": "account_id,account_name"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.json()[0]), {"account_id", "account_name"})
+        select = [query["sql"] for query in queries if '"api_account"."account_name"' in query["sql"]][-1]
+        self.assertNotIn("website", select)
+        self.assertNotIn("JOIN", select)
+
+        response = self.client.get(reverse('account-list'), {"fields": "account_name,nope"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse('user-list'), {"fields": "email", "page": 1})
+        self.assertEqual(response.json()["results"][0], {"email": self.user1.email})
+
+        cache.clear()
+        response = self.client.get(reverse('user-list'), {"fields": "email,password"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn("password", response.json()["fields"].split("Use:")[1])
+        print(" ✅ Passed!")
@@ -0,0 +1,372 @@
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import mock
+import requests
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import DatabaseError
+from django.utils import timezone
+from api.models import Account, DeliveryStat, Destination, Event, Log
+from api.tasks import send_data_to_destinations, retry_delivery, flush_micro_batch
+from api.retry import parse_retry_after, retry_delay
+from api.http_pool import SessionPool
+from api.circuit import CircuitBreaker
+from api.batching import MicroBatcher
+from api.log_writer import LogWriter
+from api.tests_api import LOCAL_CACHES
+
+
+User = get_user_model()
+
+
+def create_destination(account, user, url, http_method="POST"):
+    """Creating a destination"""
+    return Destination.objects.create(account=account, url=url,
+                                      http_method=http_method,
+                                      headers={"APP_ID": "1"},
+                                      created_by=user, updated_by=user)
+
+
+def fake_response(status_code=200, headers=None):
+    return mock.Mock(status_code=status_code, headers=headers or {})
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class DeliveryTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_superuser(email='testuser@example.com',
+                                                  password='pass13')
+        self.account = Account.objects.create(account_name='Test Account',
+                                              created_by=self.user)
+        self.destinations = [
+            create_destination(self.account, self.user, f"https://hooks.example.com/{i}")
+            for i in range(3)
+        ]
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_fan_out_runs_destinations_concurrently(self):
+        print("\nRunning test_fan_out_runs_destinations_concurrently...", end="", flush=True)
+
+        def slow_request(method, url, **kwargs):
+            time.sleep(0.3)
+            return fake_response(500 if url.endswith("/2") else 200)
+
+        event_id = uuid.uuid4()
+        with mock.patch("requests.Session.request", side_effect=slow_request) as request, \
+                mock.patch("api.tasks.retry_delivery.apply_async"):
+            started = time.monotonic()
+            send_data_to_destinations(self.account.id, str(event_id), {"a": 1}, concurrency=3)
+            elapsed = time.monotonic() - started
+        self.assertLess(elapsed, 0.8)
+        self.assertEqual(request.call_count, 3)
+        sent = request.call_args.kwargs
+        self.assertEqual(sent["headers"]["CL-X-EVENT-ID"], str(event_id))
+        self.assertEqual(sent["timeout"], (3.05, 10))
+        statuses = dict(Log.objects.values_list("destination__url", "status"))
+        self.assertEqual(statuses, {"https://hooks.example.com/0": "success",
+                                    "https://hooks.example.com/1": "success",
+                                    "https://hooks.example.com/2": "retrying"})
+        self.destinations[0].refresh_from_db()
+        self.assertNotIn("CL-X-EVENT-ID", self.destinations[0].headers)
+        print(" ✅ Passed!")
+
+    def test_session_pool_reuses_and_evicts_sessions(self):
+        print("\nRunning test_session_pool_reuses_and_evicts_sessions...", end="", flush=True)
+        pool = SessionPool(idle_timeout=60, max_hosts=2)
+        with pool.lease("https://a.example.com/hook") as first:
+            with pool.lease("https://a.example.com/other") as session:
+                self.assertIs(session, first)
+            # a is busy, so filling the pool past its cap evicts only idle sessions.
+            with pool.lease("https://b.example.com/hook"):
+                pass
+            with mock.patch.object(requests.Session, "close") as close:
+                with pool.lease("https://c.example.com/hook"):
+                    pass
+            self.assertEqual(close.call_count, 1)
+            self.assertEqual(len(pool), 2)
+        with pool.lease("https://a.example.com/hook") as session:
+            self.assertIs(session, first)
+        with mock.patch("api.http_pool.time.monotonic", return_value=time.monotonic() + 120):
+            with pool.lease("https://d.example.com/hook"):
+                pass
+        self.assertEqual(len(pool), 1)
+        pool.close()
+        print(" ✅ Passed!")
+
+    def test_pooled_sessions_do_not_replay_cookies(self):
+        print("\nRunning test_pooled_sessions_do_not_replay_cookies...", end="", flush=True)
+        received = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                received.append(self.headers.get("Cookie"))
+                self.send_response(200)
+                self.send_header("Set-Cookie", "tenant=account-1; Path=/")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/hook"
+        pool = SessionPool()
+        try:
+            for _ in range(2):
+                with pool.lease(url) as session:
+                    self.assertEqual(session.post(url, json={}, timeout=5).status_code, 200)
+        finally:
+            pool.close()
+            server.shutdown()
+            server.server_close()
+        self.assertEqual(received, [None, None])
+        print(" ✅ Passed!")
+
+    def test_failed_destination_is_retried_alone_with_backoff(self):
+        print("\nRunning test_failed_destination_is_retried_alone_with_backoff...", end="", flush=True)
+
+        def flaky_request(method, url, **kwargs):
+            if url.endswith("/1"):
+                return fake_response(503, {"Retry-After": "30"})
+            return fake_response(200)
+
+        event_id = str(uuid.uuid4())
+        with mock.patch("requests.Session.request", side_effect=flaky_request), \
+                mock.patch("api.tasks.retry_delivery.apply_async") as schedule:
+            send_data_to_destinations(self.account.id, event_id, {"a": 1})
+            schedule.assert_called_once_with(
+                args=[self.account.id, self.destinations[1].id, event_id, {"a": 1}, 2],
+                countdown=30)
+
+            retry_delivery(self.account.id, self.destinations[1].id, event_id, {"a": 1}, 5)
+            self.assertEqual(schedule.call_count, 1)
+
+        with mock.patch("requests.Session.request", return_value=fake_response(404)), \
+                mock.patch("api.tasks.retry_delivery.apply_async") as schedule:
+            retry_delivery(self.account.id, self.destinations[0].id, event_id, {"a": 1}, 2)
+            schedule.assert_not_called()
+
+        attempts = list(Log.objects.filter(destination=self.destinations[1])
+                        .order_by("attempt").values_list("attempt", "status"))
+        self.assertEqual(attempts, [(1, "retrying"), (5, "failed")])
+        self.assertEqual(Log.objects.filter(destination=self.destinations[0], status="failed").count(), 1)
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0)
+        # The broker must not redeliver a retry while its countdown is still running.
+        longest = retry_delay(1, 10 ** 6) + settings.CIRCUIT_COOLDOWN_SECONDS
+        self.assertLess(longest, settings.CELERY_BROKER_TRANSPORT_OPTIONS["visibility_timeout"])
+        print(" ✅ Passed!")
+
+    @override_settings(CIRCUIT_MIN_CALLS=2, CIRCUIT_ERROR_RATE=0.5, CIRCUIT_COOLDOWN_SECONDS=30)
+    def test_open_circuit_short_circuits_delivery(self):
+        print("\nRunning test_open_circuit_short_circuits_delivery...", end="", flush=True)
+        destination = self.destinations[0]
+        breaker = CircuitBreaker(destination.id)
+        breaker.record(True, 0.1)
+        breaker.record(False, 0.1)
+        self.assertEqual(breaker.state(), "open")
+
+        event_id = str(uuid.uuid4())
+        with mock.patch("requests.Session.request", return_value=fake_response(200)) as request, \
+                mock.patch("api.tasks.retry_delivery.apply_async") as schedule:
+            retry_delivery(self.account.id, destination.id, event_id, {"a": 1}, 2)
+        request.assert_not_called()
+        self.assertGreaterEqual(schedule.call_args.kwargs["countdown"], 30)
+        # A deferral is not an attempt: the same attempt number is rescheduled.
+        self.assertEqual(schedule.call_args.kwargs["args"][-1], 2)
+        self.assertEqual(Log.objects.get(destination=destination).status, "deferred")
+
+        with mock.patch("api.circuit.time.time", return_value=time.time() + 31), \
+                mock.patch("requests.Session.request") as request, \
+                mock.patch("api.tasks.retry_delivery.apply_async") as schedule:
+            self.assertTrue(breaker.allow_request())  # Another worker holds the probe
+            retry_delivery(self.account.id, destination.id, event_id, {"a": 1}, 5)
+        request.assert_not_called()
+        self.assertGreaterEqual(schedule.call_args.kwargs["countdown"], 30)
+        self.assertEqual(schedule.call_args.kwargs["args"][-1], 5)
+        breaker.store.delete(f"circuit_{destination.id}_probe")
+
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        res = client.get(f"/destinations/{destination.id}/circuit/")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()["state"], "open")
+        self.assertEqual(res.json()["failures"], 1)
+
+        with mock.patch("api.circuit.time.time", return_value=time.time() + 31):
+            self.assertEqual(breaker.state(), "half_open")
+            self.assertTrue(breaker.allow_request())
+            self.assertFalse(breaker.allow_request())
+            breaker.record(True, 0.1)
+            self.assertEqual(breaker.state(), "closed")
+        print(" ✅ Passed!")
+
+    @override_settings(CIRCUIT_MIN_CALLS=2, CIRCUIT_ERROR_RATE=0.5, CIRCUIT_CACHE_ALIAS="breakers",
+                       CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                                           "LOCATION": "breaker-test-default"},
+                               "breakers": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                                            "LOCATION": "breaker-test-shared"}})
+    def test_circuit_state_is_shared_between_breakers(self):
+        print("\nRunning test_circuit_state_is_shared_between_breakers...", end="", flush=True)
+        destination_id = self.destinations[0].id
+        worker_a, worker_b = CircuitBreaker(destination_id), CircuitBreaker(destination_id)
+        worker_a.record(False, 0.1)
+        worker_b.record(False, 0.1)
+        self.assertEqual(worker_a.state(), "open")
+        self.assertFalse(worker_b.allow_request())
+        self.assertEqual(worker_b.snapshot()["failures"], 2)
+        self.assertIsNone(caches["default"].get(f"circuit_{destination_id}_opened_at"))
+        caches["breakers"].clear()
+        print(" ✅ Passed!")
+
+    def test_micro_batched_destination_sends_one_request_per_batch(self):
+        print("\nRunning test_micro_batched_destination_sends_one_request_per_batch...", end="", flush=True)
+        Destination.objects.exclude(id=self.destinations[0].id).delete()
+        destination = self.destinations[0]
+        destination.batch_enabled = True
+        destination.batch_max_events = 2
+        destination.save()
+        events = [(str(uuid.uuid4()), {"n": n}) for n in range(3)]
+
+        with mock.patch("requests.Session.request") as request, \
+                mock.patch("api.tasks.flush_micro_batch.apply_async") as timer, \
+                mock.patch("api.tasks.flush_micro_batch.delay") as flush_now:
+            for event_id, data in events:
+                send_data_to_destinations(self.account.id, event_id, data)
+            request.assert_not_called()
+            self.assertEqual([c.kwargs["args"] for c in timer.call_args_list],
+                             [[destination.id, 0], [destination.id, 1]])
+            flush_now.assert_called_once_with(destination.id, 0)
+
+        with mock.patch("requests.Session.request", return_value=fake_response(200)) as request:
+            flush_micro_batch(destination.id, 0)
+            flush_micro_batch(destination.id, 0)
+            flush_micro_batch(destination.id, 1)
+        self.assertEqual(request.call_count, 2)
+        first = request.call_args_list[0].kwargs
+        self.assertEqual(first["json"], [{"event_id": e, "data": d} for e, d in events[:2]])
+        self.assertIn("CL-X-BATCH-ID", first["headers"])
+        self.assertNotIn("CL-X-EVENT-ID", first["headers"])
+
+        logs = list(Log.objects.order_by("id").values_list("batch_id", "status"))
+        self.assertEqual(len(logs), 3)
+        self.assertEqual(logs[0], logs[1])
+        self.assertEqual(str(logs[0][0]), first["headers"]["CL-X-BATCH-ID"])
+        self.assertNotEqual(logs[1][0], logs[2][0])
+        print(" ✅ Passed!")
+
+    def test_micro_batch_flush_gives_up_on_missing_events(self):
+        print("\nRunning test_micro_batch_flush_gives_up_on_missing_events...", end="", flush=True)
+        Destination.objects.exclude(id=self.destinations[0].id).delete()
+        destination = self.destinations[0]
+        destination.batch_enabled = True
+        destination.batch_max_events = 3
+        destination.save()
+        batcher = MicroBatcher(destination.id, 3, destination.batch_max_wait_ms)
+
+        with mock.patch("api.tasks.flush_micro_batch.apply_async"):
+            send_data_to_destinations(self.account.id, str(uuid.uuid4()), {"n": 1})
+        batcher._incr(batcher._key(0, "n"))  # A slot claimed by a worker that never wrote its event
+
+        with mock.patch("requests.Session.request", return_value=fake_response(200)) as request, \
+                mock.patch("api.tasks.flush_micro_batch.apply_async") as follow_up:
+            flush_micro_batch(destination.id, 0)
+            follow_up.assert_called_once_with(args=[destination.id, 0, [2], 2], countdown=1)
+            flush_micro_batch(destination.id, 0, [2], 5)
+            follow_up.assert_called_once()
+        self.assertEqual(request.call_count, 1)
+        self.assertFalse(batcher.store.add(batcher._key(0, 2), 123))
+
+        with mock.patch.object(MicroBatcher, "add", return_value=(1, None)), \
+                mock.patch("api.tasks.flush_micro_batch.apply_async") as timer:
+            send_data_to_destinations(self.account.id, str(uuid.uuid4()), {"n": 2})
+        timer.assert_not_called()
+        self.assertEqual(sorted(Log.objects.values_list("status", flat=True)), ["failed", "success"])
+        print(" ✅ Passed!")
+
+    def test_log_writer_buffers_and_bulk_inserts(self):
+        print("\nRunning test_log_writer_buffers_and_bulk_inserts...", end="", flush=True)
+        writer = LogWriter(max_buffer=3)
+
+        def make_log():
+            event = Event.objects.create(account=self.account, event_id=str(uuid.uuid4()),
+                                         received_data={})
+            return Log(event=event, account=self.account, destination=self.destinations[0],
+                       status="success")
+
+        writer.add(make_log())
+        writer.add(make_log())
+        self.assertEqual(Log.objects.count(), 0)
+        log = make_log()
+        with self.assertNumQueries(3):  # savepoint, one INSERT, release
+            writer.add(log)
+        self.assertEqual(Log.objects.count(), 3)
+        self.assertEqual(len(writer), 0)
+        writer.add(make_log())
+        writer.flush_if_due()
+        self.assertEqual(Log.objects.count(), 4)
+
+        writer.add(make_log())
+        with mock.patch("api.log_writer.record_deliveries", side_effect=DatabaseError), \
+                self.assertRaises(DatabaseError):
+            writer.flush()
+        self.assertEqual(Log.objects.count(), 4)
+        self.assertEqual(len(writer), 1)
+        writer.flush()
+        self.assertEqual(Log.objects.count(), 5)
+
+        # While the database is down, add() never raises and the buffer stays capped.
+        logs = [make_log() for _ in range(5)]
+        with mock.patch("api.log_writer.record_deliveries", side_effect=DatabaseError), \
+                self.assertLogs("api.log_writer", level="WARNING") as logged:
+            for log in logs:
+                writer.add(log)
+                self.assertLessEqual(len(writer), 3)
+        self.assertTrue(any("dropped the 1 oldest rows" in line for line in logged.output))
+        writer.flush()
+        self.assertEqual(Log.objects.count(), 8)
+        self.assertEqual(set(Log.objects.order_by("-id").values_list("event_id", flat=True)[:3]),
+                         {log.event_id for log in logs[-3:]})
+        print(" ✅ Passed!")
+
+    def test_delivery_stats_are_rolled_up_per_destination(self):
+        print("\nRunning test_delivery_stats_are_rolled_up_per_destination...", end="", flush=True)
+
+        def timed_request(method, url, **kwargs):
+            if url.endswith("/0"):
+                time.sleep(0.03)
+            return fake_response(500 if url.endswith("/2") else 200)
+
+        processed = timezone.now()  # One minute bucket, whenever the test runs
+        with mock.patch("requests.Session.request", side_effect=timed_request), \
+                mock.patch("api.tasks.retry_delivery.apply_async"), \
+                mock.patch("api.tasks.now", return_value=processed):
+            for _ in range(4):
+                send_data_to_destinations(self.account.id, str(uuid.uuid4()), {"a": 1})
+        self.assertEqual(DeliveryStat.objects.filter(granularity="minute").count(), 3)
+
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        res = client.get(f"/destinations/{self.destinations[0].id}/stats/?granularity=minute")
+        self.assertEqual(res.status_code, 200)
+        summary = res.json()["summary"]
+        self.assertEqual((summary["success"], summary["failed"], summary["success_rate"]), (4, 0, 1.0))
+        self.assertTrue(25 <= summary["latency_p50_ms"] <= summary["latency_p95_ms"] <= 100)
+        self.assertEqual(sum(bucket["success"] for bucket in res.json()["buckets"]), 4)
+
+        res = client.get(f"/accounts/{self.account.account_id}/stats/")
+        summary = res.json()["summary"]
+        self.assertEqual((summary["success"], summary["failed"]), (8, 4))
+        self.assertEqual(summary["by_destination"][str(self.destinations[2].id)]["success_rate"], 0.0)
+
+        res = client.get(f"/destinations/{self.destinations[0].id}/stats/?granularity=day")
+        self.assertEqual(res.status_code, 400)
+        print(" ✅ Passed!")
@@ -0,0 +1,235 @@
+import gzip
+import io
+import json
+import uuid
+from datetime import date, datetime, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from django.core.cache import cache
+from api.models import Account
+from api.account_cache import get_account_by_token, token_cache
+from api.dedup import EventDeduplicator
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer
+from api.tests_api import LOCAL_CACHES
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+
+User = get_user_model()
+
+INCOMING_URL = "/server/incoming_data/"
+BATCH_URL = "/server/incoming_data/batch/"
+
+
+def create_super_user(email='testuser@example.com',
+                      password='pass13'):
+        """Function to create super user"""
+        user = User.objects.create_superuser(email=email,
+                                             password=password)
+        return user
+
+def create_account(account_name='Test Account',
+                   created_by=None):
+    """Creating an account """
+    acc = Account.objects.create(account_name=account_name,
+                                 website='https://example.com',
+                                 created_by=created_by)
+    return acc
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class IncomingDataTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_super_user()
+        self.client.force_authenticate(user=self.user)
+        self.account = create_account(created_by=self.user)
+        self.task = mock.patch("api.views.send_data_to_destinations").start()
+        self.bulk_task = mock.patch("api.ingest.send_data_to_destinations").start()
+
+    def tearDown(self):
+        mock.patch.stopall()
+        cache.clear()
+        token_cache.clear()
+
+    def test_single_event_rejects_duplicates(self):
+        print("\nRunning test_single_event_rejects_duplicates...", end="", flush=True)
+        headers = {"HTTP_CL_X_TOKEN": self.account.app_secret_token,
+                   "HTTP_CL_X_EVENT_ID": "evt-1"}
+        res = self.client.post(INCOMING_URL, {"data": {"a": 1}}, format='json', **headers)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        res = self.client.post(INCOMING_URL, {"data": {"a": 1}}, format='json', **headers)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.task.delay.call_count, 1)
+        print(" ✅ Passed!")
+
+    def test_batch_reports_result_per_item(self):
+        print("\nRunning test_batch_reports_result_per_item...", end="", flush=True)
+        payload = [
+            {"event_id": "evt-1", "data": {"a": 1}},
+            {"event_id": "evt-2", "data": {"b": 2}},
+            {"event_id": "evt-1", "data": {"a": 1}},
+            {"data": {"c": 3}},
+        ]
+        res = self.client.post(BATCH_URL, payload, format='json',
+                               HTTP_CL_X_TOKEN=self.account.app_secret_token)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        results = res.json()["results"]
+        self.assertEqual([r["status"] for r in results],
+                         ["accepted", "accepted", "duplicate", "invalid"])
+        self.assertIn("event_id", results[3]["errors"])
+        args, _ = self.bulk_task.chunks.call_args
+        self.assertEqual(args[0], [(self.account.id, "evt-1", {"a": 1}),
+                                   (self.account.id, "evt-2", {"b": 2})])
+        self.bulk_task.chunks.return_value.apply_async.assert_called_once()
+
+        res = self.client.post(BATCH_URL, payload[:2], format='json',
+                               HTTP_CL_X_TOKEN=self.account.app_secret_token)
+        self.assertEqual([r["status"] for r in res.json()["results"]],
+                         ["duplicate", "duplicate"])
+        print(" ✅ Passed!")
+
+    def test_failed_enqueue_releases_claimed_ids(self):
+        print("\nRunning test_failed_enqueue_releases_claimed_ids...", end="", flush=True)
+        headers = {"HTTP_CL_X_TOKEN": self.account.app_secret_token,
+                   "HTTP_CL_X_EVENT_ID": "evt-1"}
+        self.task.delay.side_effect = ConnectionError("broker down")
+        with self.assertRaises(ConnectionError):
+            self.client.post(INCOMING_URL, {"data": {"a": 1}}, format='json', **headers)
+        self.task.delay.side_effect = None
+        res = self.client.post(INCOMING_URL, {"data": {"a": 1}}, format='json', **headers)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+
+        payload = [{"event_id": "evt-2", "data": {}}, {"event_id": "evt-3", "data": {}}]
+        self.bulk_task.chunks.return_value.apply_async.side_effect = ConnectionError("broker down")
+        with self.assertRaises(ConnectionError):
+            self.client.post(BATCH_URL, payload, format='json',
+                             HTTP_CL_X_TOKEN=self.account.app_secret_token)
+        self.bulk_task.chunks.return_value.apply_async.side_effect = None
+        res = self.client.post(BATCH_URL, payload, format='json',
+                               HTTP_CL_X_TOKEN=self.account.app_secret_token)
+        self.assertEqual([r["status"] for r in res.json()["results"]], ["accepted", "accepted"])
+        print(" ✅ Passed!")
+
+    def test_batch_requires_valid_token(self):
+        print("\nRunning test_batch_requires_valid_token...", end="", flush=True)
+        payload = [{"event_id": "evt-1", "data": {}}]
+        res = self.client.post(BATCH_URL, payload, format='json', HTTP_CL_X_TOKEN="nope")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.post(BATCH_URL, {"event_id": "evt-1"}, format='json',
+                               HTTP_CL_X_TOKEN=self.account.app_secret_token)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.bulk_task.chunks.assert_not_called()
+        print(" ✅ Passed!")
+
+    def test_stream_parses_ndjson_lines(self):
+        print("\nRunning test_stream_parses_ndjson_lines...", end="", flush=True)
+        body = b"\n".join([
+            b'{"event_id": "evt-1", "data": {"a": 1}}',
+            b'{"event_id": "evt-2", "data": [1, 2]}',
+            b'',
+            b'{"event_id": "evt-1", "data": {"a": 1}}',
+            b'{"event_id": ',
+            b'{"data": {}}',
+        ])
+        res = self.client.post("/server/incoming_data/stream/", body,
+                               content_type="application/x-ndjson",
+                               HTTP_CL_X_TOKEN=self.account.app_secret_token)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        data = res.json()
+        self.assertEqual((data["accepted"], data["duplicate"], data["invalid"]), (2, 1, 2))
+        self.assertEqual([error["line"] for error in data["errors"]], [5, 6])
+        args, _ = self.bulk_task.chunks.call_args
+        self.assertEqual(args[0], [(self.account.id, "evt-1", {"a": 1}),
+                                   (self.account.id, "evt-2", [1, 2])])
+        print(" ✅ Passed!")
+
+    def test_token_resolution_is_cached_and_invalidated(self):
+        print("\nRunning test_token_resolution_is_cached_and_invalidated...", end="", flush=True)
+        token = self.account.app_secret_token
+        self.assertEqual(get_account_by_token(token).id, self.account.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_account_by_token(token).id, self.account.id)
+        self.assertIsNone(get_account_by_token("unknown"))
+        with self.assertNumQueries(0):
+            self.assertIsNone(get_account_by_token("unknown"))
+        # Deleted by another process: only the shared generation tells this one.
+        with mock.patch("api.signals.invalidate_account_token"):
+            self.account.delete()
+        self.assertIsNone(get_account_by_token(token))
+        print(" ✅ Passed!")
+
+    def test_deduplicator_is_atomic_across_workers(self):
+        print("\nRunning test_deduplicator_is_atomic_across_workers...", end="", flush=True)
+        dedup = EventDeduplicator(retention=60)
+        self.assertEqual(dedup.claim(1, ["a", "b", "a"]), [True, True, False])
+        self.assertEqual(dedup.claim(1, ["a", "c"]), [False, True])
+        self.assertEqual(dedup.claim(2, ["a"]), [True])
+        other_worker = EventDeduplicator(retention=60)
+        self.assertEqual(other_worker.claim(1, ["b", "d"]), [False, True])
+        print(" ✅ Passed!")
+
+    def test_fast_json_matches_drf_json(self):
+        print("\nRunning test_fast_json_matches_drf_json...", end="", flush=True)
+        data = {
+            "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+            "at": datetime(2025, 3, 1, 12, 30, 5, 123456, tzinfo=dt_timezone.utc),
+            "day": date(2025, 3, 1),
+            "amount": Decimal("12.50"),
+            "text": "Zoë ✓",
+            "nested": [{"n": 1, "ok": True, "none": None}, (1, 2), 2.5],
+            "by_destination": {7: {"success": 3}},
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        huge = {"big": 10 ** 20}
+        self.assertEqual(FastJSONRenderer().render(huge), JSONRenderer().render(huge))
+
+        for body in [b'{"a": [1, 2.5, "x\\u00e9"], "b": null}', b'{"big": 123456789012345678901234}']:
+            self.assertEqual(FastJSONParser().parse(io.BytesIO(body)), JSONParser().parse(io.BytesIO(body)))
+        for body in [b'{"a": ', b'{"a": NaN}']:
+            with self.assertRaisesMessage(ParseError, "JSON parse error"):
+                FastJSONParser().parse(io.BytesIO(body))
+
+        headers = {"HTTP_CL_X_TOKEN": self.account.app_secret_token, "HTTP_CL_X_EVENT_ID": "evt-1"}
+        res = self.client.post(INCOMING_URL, b'{"data": {"big": 123456789012345678901234, "f": 0.1}}',
+                               content_type="application/json", **headers)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(self.task.delay.call_args[0][2], {"big": 123456789012345678901234, "f": 0.1})
+        print(" ✅ Passed!")
+
+    @override_settings(INGEST_MAX_DECOMPRESSED_BYTES=64 * 1024, INGEST_DECOMPRESS_CHUNK_SIZE=1024)
+    def test_compressed_request_bodies_are_decoded_with_a_limit(self):
+        print("\nRunning test_compressed_request_bodies_are_decoded_with_a_limit...", end="", flush=True)
+        token = self.account.app_secret_token
+        body = gzip.compress(b'{"data": {"items": ' + json.dumps(["same"] * 500).encode() + b'}}')
+        res = self.client.post(INCOMING_URL, body, content_type="application/json",
+                               HTTP_CONTENT_ENCODING="gzip", HTTP_CL_X_TOKEN=token, HTTP_CL_X_EVENT_ID="evt-1")
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(self.task.delay.call_args[0][2], {"items": ["same"] * 500})
+
+        lines = b"\n".join(b'{"event_id": "line-%d", "data": {"n": %d}}' % (n, n) for n in range(50))
+        res = self.client.post("/server/incoming_data/stream/", gzip.compress(lines),
+                               content_type="application/x-ndjson",
+                               HTTP_CONTENT_ENCODING="gzip", HTTP_CL_X_TOKEN=token)
+        self.assertEqual(res.json()["accepted"], 50)
+
+        bomb = gzip.compress(b'{"data": "' + b"a" * (10 * 1024 * 1024) + b'"}')
+        self.assertLess(len(bomb), 20 * 1024)
+        res = self.client.post(INCOMING_URL, bomb, content_type="application/json",
+                               HTTP_CONTENT_ENCODING="gzip", HTTP_CL_X_TOKEN=token, HTTP_CL_X_EVENT_ID="evt-2")
+        self.assertEqual(res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        res = self.client.post(INCOMING_URL, body[:-10], content_type="application/json",
+                               HTTP_CONTENT_ENCODING="gzip", HTTP_CL_X_TOKEN=token, HTTP_CL_X_EVENT_ID="evt-3")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.post(INCOMING_URL, body, content_type="application/json",
+                               HTTP_CONTENT_ENCODING="compress", HTTP_CL_X_TOKEN=token, HTTP_CL_X_EVENT_ID="evt-4")
+        self.assertEqual(res.status_code, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        print(" ✅ Passed!")
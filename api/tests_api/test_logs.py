@@ -0,0 +1,349 @@
+import csv
+import gzip
+import io
+import json
+import tempfile
+import uuid
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock, skipUnless
+from django.test import TestCase, override_settings
+from django.utils.timezone import now
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework import status
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from api.models import Account, AccountMember, Destination, Event, Log
+from api.archive import archive_account_logs, log_archive
+from api.pagination import KeysetPagination
+from api.fast_read import row_reader
+from api.serializers import AccountMemberSerializer, AccountSerializer, DestinationSerializer, LogSerializer
+from api.tasks import purge_deleted_rows, purge_expired_logs, send_data_to_destinations
+from api.tests_api import LOCAL_CACHES
+
+
+User = get_user_model()
+
+
+def create_logs(account, user, events=3, destinations=2):
+    """Creating events fanned out to several destinations"""
+    targets = [Destination.objects.create(account=account,
+                                          url=f"https://hooks.example.com/{account.id}/{n}",
+                                          http_method="POST", headers={},
+                                          created_by=user, updated_by=user)
+               for n in range(destinations)]
+    for n in range(events):
+        event = Event.objects.create(account=account, event_id=f"evt-{account.id}-{n}",
+                                     received_data={"n": n})
+        for destination in targets:
+            Log.objects.create(event=event, account=account, destination=destination,
+                               status="success")
+    return targets
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class LogTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_superuser(email='testuser@example.com',
+                                                  password='pass13')
+        self.client.force_authenticate(user=self.user)
+        self.account = Account.objects.create(account_name='Test Account',
+                                              created_by=self.user)
+        AccountMember.objects.create(account=self.account, user=self.user,
+                                     role_id=1, created_by=self.user)
+        create_logs(self.account, self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_payload_is_stored_once_per_event(self):
+        print("\nRunning test_payload_is_stored_once_per_event...", end="", flush=True)
+        self.assertEqual(Event.objects.count(), 3)
+        self.assertEqual(Log.objects.count(), 6)
+        res = self.client.get("/logs/")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        row = res.json()["results"][0]
+        self.assertEqual(list(row), ["id", "event_id", "received_timestamp", "processed_timestamp",
+                                     "received_data", "status", "attempt", "batch_id",
+                                     "account", "destination"])
+        self.assertEqual(row["received_data"], {"n": int(row["event_id"].rsplit("-", 1)[1])})
+        print(" ✅ Passed!")
+
+    def test_cursor_pagination_walks_every_log_once(self):
+        print("\nRunning test_cursor_pagination_walks_every_log_once...", end="", flush=True)
+        # Every row shares one timestamp, so only the id tiebreaker orders them.
+        Log.objects.update(received_timestamp=Log.objects.first().received_timestamp)
+        seen = []
+        url = "/logs/?page_size=4&status=success"
+        with CaptureQueriesContext(connection) as queries:
+            while url:
+                res = self.client.get(url)
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                seen.extend(row["id"] for row in res.json()["results"])
+                url = res.json()["next"]
+        self.assertEqual(seen, sorted(Log.objects.values_list("id", flat=True), reverse=True))
+        sql = " ".join(query["sql"] for query in queries.captured_queries).upper()
+        self.assertNotIn("COUNT(", sql)
+        self.assertNotIn("OFFSET", sql)
+
+        res = self.client.get(res.json()["previous"])
+        self.assertEqual([row["id"] for row in res.json()["results"]], seen[:4])
+        self.assertIsNone(res.json()["previous"])
+        print(" ✅ Passed!")
+
+
+    def test_fast_read_path_matches_serializers_byte_for_byte(self):
+        print("\nRunning test_fast_read_path_matches_serializers_byte_for_byte...", end="", flush=True)
+        for serializer_class in [AccountSerializer, AccountMemberSerializer, DestinationSerializer, LogSerializer]:
+            self.assertIsNotNone(row_reader(serializer_class))
+        event = Event.objects.first()
+        event.received_data = {"name": "Zoë ✓", "nested": [1, 2.5, None, {"ok": True}], "big": 10 ** 20}
+        event.save()
+        Log.objects.filter(id=Log.objects.first().id).update(processed_timestamp=now(), attempt=3,
+                                                              batch_id=uuid.uuid4(), status="failed")
+        Destination.objects.update(headers={"X-Token": "abc", "Accept": "application/json"})
+        urls = ["/logs/", "/logs/?page_size=2&ordering=processed_timestamp", "/logs/?status=failed",
+                "/accounts/", "/accounts/?page_size=1", "/accounts/?fields=account_id,website",
+                "/account_members/", "/destinations/", "/destinations/?fields=headers,account&page=1"]
+        for url in urls:
+            bodies = []
+            for fast in [False, True]:
+                cache.clear()  # Neither the response cache nor the throttle may answer
+                with override_settings(FAST_READ_PATH=fast):
+                    res = self.client.get(url)
+                self.assertEqual(res.status_code, status.HTTP_200_OK, url)
+                bodies.append(res.content)
+            self.assertEqual(bodies[0], bodies[1], url)
+        print(" ✅ Passed!")
+
+    @override_settings(RESPONSE_COMPRESSION_MIN_BYTES=100)
+    def test_list_and_export_responses_are_compressed_on_request(self):
+        print("\nRunning test_list_and_export_responses_are_compressed_on_request...", end="", flush=True)
+        plain = self.client.get("/logs/")
+        self.assertNotIn("Content-Encoding", plain)
+        self.assertIn("Accept-Encoding", plain["Vary"])
+
+        cache.clear()
+        res = self.client.get("/logs/", HTTP_ACCEPT_ENCODING="br;q=0, gzip;q=0.8, identity;q=0.1")
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(res.content), plain.content)
+        self.assertTrue(res["ETag"].startswith('W/"'))
+        res = self.client.get("/logs/", HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=res["ETag"])
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        res = self.client.get("/logs/export/?output=ndjson", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(res["Content-Encoding"], "gzip")
+        self.assertEqual(len(gzip.decompress(b"".join(res.streaming_content)).splitlines()), 6)
+
+        res = self.client.get("/logs/?page_size=1", HTTP_ACCEPT_ENCODING="gzip;q=0")
+        self.assertNotIn("Content-Encoding", res)
+        print(" ✅ Passed!")
+
+    @override_settings(LOG_PURGE_CHUNK_SIZE=2, LOG_PURGE_CHUNK_PAUSE=0)
+    def test_expired_logs_are_purged_in_chunks(self):
+        print("\nRunning test_expired_logs_are_purged_in_chunks...", end="", flush=True)
+        self.account.log_retention_days = 7
+        self.account.save()
+        old = Event.objects.filter(event_id__in=[f"evt-{self.account.id}-0", f"evt-{self.account.id}-1"])
+        old.update(received_timestamp=now() - timedelta(days=8))
+        Log.objects.filter(event__in=old).update(received_timestamp=now() - timedelta(days=8))
+        with CaptureQueriesContext(connection) as queries:
+            purge_expired_logs()
+        deletes = [query["sql"] for query in queries.captured_queries
+                   if query["sql"].startswith('DELETE FROM "api_log"')]
+        self.assertGreaterEqual(len(deletes), 2)
+        self.assertEqual(Log.objects.count(), 2)
+        self.assertEqual(list(Event.objects.values_list("event_id", flat=True)),
+                         [f"evt-{self.account.id}-2"])
+        print(" ✅ Passed!")
+
+    @mock.patch("api.signals.purge_deleted_rows.delay")
+    def test_account_delete_hands_logs_to_purge_task(self, mock_delay):
+        print("\nRunning test_account_delete_hands_logs_to_purge_task...", end="", flush=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.delete(f"/accounts/{self.account.account_id}/")
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Account.objects.filter(id=self.account.id).exists())
+        # The delete itself leaves the log rows to the background purge.
+        self.assertEqual(Log.objects.count(), 6)
+        mock_delay.assert_any_call(account_id=self.account.id)
+        purge_deleted_rows(account_id=self.account.id)
+        self.assertEqual(Log.objects.count(), 0)
+        # A delivery task still queued for the account stores nothing,
+        send_data_to_destinations(self.account.id, "late-event", {"a": 1})
+        self.assertEqual(Event.objects.count(), 0)
+        # and the periodic purge removes rows written after the one-off purge ran.
+        Event.objects.create(account_id=self.account.id, event_id="late-event", received_data={})
+        purge_expired_logs()
+        self.assertEqual(Log.objects.count(), 0)
+        self.assertEqual(Event.objects.count(), 0)
+        print(" ✅ Passed!")
+
+
+    def test_export_streams_filtered_logs(self):
+        print("\nRunning test_export_streams_filtered_logs...", end="", flush=True)
+        destination = Log.objects.first().destination_id
+        listed = self.client.get(f"/logs/?destination={destination}").json()["results"]
+
+        res = self.client.get(f"/logs/export/?destination={destination}")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in b"".join(res.streaming_content).splitlines()]
+        self.assertEqual(rows, listed)
+
+        res = self.client.get(f"/logs/export/?destination={destination}&output=csv")
+        self.assertEqual(res["Content-Type"], "text/csv")
+        table = list(csv.DictReader(io.StringIO(b"".join(res.streaming_content).decode())))
+        self.assertEqual([row["id"] for row in table], [str(row["id"]) for row in listed])
+        self.assertEqual(json.loads(table[0]["received_data"]), listed[0]["received_data"])
+        self.assertEqual(table[0]["received_timestamp"], listed[0]["received_timestamp"])
+        self.assertEqual(table[0]["batch_id"], "")
+
+        res = self.client.get("/logs/export/?output=xml")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        print(" ✅ Passed!")
+
+
+    @override_settings(LOG_ARCHIVE_BLOCK_ROWS=2)
+    def test_old_logs_move_to_archive_and_stay_queryable(self):
+        print("\nRunning test_old_logs_move_to_archive_and_stay_queryable...", end="", flush=True)
+        first = Event.objects.get(event_id=f"evt-{self.account.id}-0")
+        Event.objects.update(received_timestamp=now() - timedelta(days=11))
+        Log.objects.update(received_timestamp=now() - timedelta(days=10))
+        Log.objects.filter(event=first).update(received_timestamp=now() - timedelta(days=11))
+        # Rows inside one millisecond, their ids running against their times.
+        base = (now() - timedelta(days=10)).replace(microsecond=0)
+        for offset, pk in enumerate(Log.objects.exclude(event=first).order_by("-id").values_list("id", flat=True)):
+            Log.objects.filter(id=pk).update(received_timestamp=base + timedelta(microseconds=offset + 1))
+        exact = dict(Log.objects.values_list("id", "received_timestamp"))
+        oldest_first = sorted(exact, key=lambda pk: (exact[pk], pk))
+        listed = {row["id"]: row for row in self.client.get("/logs/").json()["results"]}
+
+        with tempfile.TemporaryDirectory() as root, mock.patch.object(log_archive, "root", Path(root)):
+            append_block = log_archive.append_block
+
+            def crash_after_append(*args):
+                append_block(*args)
+                raise RuntimeError("worker lost before the block's rows were deleted")
+
+            with mock.patch.object(log_archive, "append_block", side_effect=crash_after_append), \
+                    self.assertRaises(RuntimeError):
+                archive_account_logs(self.account)
+            self.assertEqual(Log.objects.count(), 6)
+            # The block already on disk is not written a second time.
+            self.assertEqual(archive_account_logs(self.account), 4)
+            self.assertEqual(Log.objects.count(), 0)
+            self.assertEqual(Event.objects.count(), 0)
+            days = log_archive.days(self.account.id)
+            self.assertEqual(len(days), 2)
+            self.assertEqual(sum(entry["rows"] for day in days
+                                 for entry in log_archive.read_index(self.account.id, day)), 6)
+            self.assertEqual([entry["rows"] for entry in log_archive.read_index(self.account.id, days[1])],
+                             [2, 2])
+
+            def walk(url):
+                rows = []
+                while url:
+                    cache.clear()  # Keep the request throttle out of the way
+                    res = self.client.get(url)
+                    self.assertEqual(res.status_code, status.HTTP_200_OK)
+                    rows += res.json()["results"]
+                    url = res.json()["next"]
+                return rows
+
+            # One row per page: each cursor must step past rows sharing a millisecond.
+            rows = walk(f"/logs/archived/?account={self.account.id}&page_size=1")
+            self.assertTrue(rows[-1]["received_timestamp"].endswith(".000004Z"))
+            self.assertEqual([row["id"] for row in rows], oldest_first)
+            self.assertEqual({row["id"]: row for row in rows}, listed)
+
+            # The regular list and export fall through to the archive, newest first.
+            rows = walk("/logs/?page_size=4")
+            self.assertEqual([row["id"] for row in rows], oldest_first[::-1])
+            self.assertEqual({row["id"]: row for row in rows}, listed)
+            self.assertEqual([row["id"] for row in walk("/logs/?page_size=1&status=success")][:3],
+                             oldest_first[::-1][:3])
+            self.assertEqual(walk("/logs/?status=failed"), [])
+            cache.clear()
+            res = self.client.get("/logs/export/")
+            exported = [json.loads(line) for line in b"".join(res.streaming_content).splitlines()]
+            self.assertEqual(exported, rows)
+
+            res = self.client.get(f"/logs/archived/?account={self.account.id}&event_id={first.event_id}")
+            self.assertEqual({row["event_id"] for row in res.json()["results"]}, {first.event_id})
+            self.assertEqual(len(res.json()["results"]), 2)
+
+            # Segments of deleted accounts are removed, by the delete's purge or by the periodic sweep.
+            (Path(root) / "999999").mkdir()
+            purge_expired_logs()
+            self.assertEqual(log_archive.account_ids(), [self.account.id])
+            purge_deleted_rows(account_id=self.account.id)
+            self.assertEqual(log_archive.account_ids(), [])
+        print(" ✅ Passed!")
+
+
+@skipUnless(connection.vendor == "sqlite", "Plans are checked against SQLite's EXPLAIN QUERY PLAN")
+@override_settings(CACHES=LOCAL_CACHES)
+class LogQueryPlanTests(TestCase):
+    """The /logs/ queries must be served by an index, never by a full scan and sort."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_superuser(email='planner@example.com',
+                                                  password='pass13')
+        self.account = Account.objects.create(account_name='Plan Account',
+                                              created_by=self.user)
+        self.destination = create_logs(self.account, self.user)[0]
+
+    def tearDown(self):
+        cache.clear()
+
+    def plan_for(self, url, role_id):
+        """EXPLAIN QUERY PLAN of the log page query issued for ``url``."""
+        AccountMember.objects.update_or_create(account=self.account, user=self.user,
+                                               defaults={"role_id": role_id,
+                                                         "created_by": self.user})
+        self.client.force_authenticate(user=self.user)
+        cache.clear()  # Keep the request throttle out of the way
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        sql = next(query["sql"] for query in queries.captured_queries
+                   if 'FROM "api_log"' in query["sql"])
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return "\n".join(row[-1] for row in cursor.fetchall())
+
+    def assertUsesIndex(self, plan, index, ordered=True):
+        self.assertIn(f"USING INDEX {index}", plan)
+        self.assertNotRegex(plan, r"SCAN api_log(?! USING)")
+        if ordered:
+            self.assertNotIn("TEMP B-TREE FOR ORDER BY", plan)
+
+    def test_hot_log_queries_use_indexes(self):
+        print("\nRunning test_hot_log_queries_use_indexes...", end="", flush=True)
+        cursor = "&cursor=" + KeysetPagination().encode_cursor(Log.objects.first().received_timestamp,
+                                                              Log.objects.first().id, False)
+        cases = [
+            ("/logs/", 1, "api_log_receive_3146ae_idx"),
+            (f"/logs/?account={self.account.id}", 1, "api_log_account_c0c536_idx"),
+            (f"/logs/?destination={self.destination.id}&status=success", 1,
+             "api_log_destina_3b0ffc_idx"),
+            (f"/logs/?destination={self.destination.id}&status=success{cursor}", 1,
+             "api_log_destina_3b0ffc_idx"),
+        ]
+        for url, role_id, index in cases:
+            with self.subTest(url=url, role_id=role_id):
+                self.assertUsesIndex(self.plan_for(url, role_id), index)
+        # Members are scoped with account_id IN (...): each account is an index
+        # range, and only the rows of the member's accounts are merged and sorted.
+        for url in ["/logs/", f"/logs/?cursor={cursor[8:]}"]:
+            with self.subTest(url=url, role_id=2):
+                self.assertUsesIndex(self.plan_for(url, 2), "api_log_account_c0c536_idx",
+                                     ordered=False)
+        print(" ✅ Passed!")
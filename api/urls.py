@@ -39,4 +39,10 @@ urlpatterns = [
     path('logout/', LogoutView.as_view(), name='logout'),
 
     path("server/incoming_data/", IncomingDataHandlerViewSet.as_view({"post": "incoming_data"})),
+
+    path("server/incoming_data/batch/", IncomingDataHandlerViewSet.as_view({"post": "incoming_data_batch"})),
+
+    # Routed by hand, so pass the @action options (its NDJSON parser) the way the router would.
+    path("server/incoming_data/stream/", IncomingDataHandlerViewSet.as_view(
+        {"post": "incoming_data_stream"}, **IncomingDataHandlerViewSet.incoming_data_stream.kwargs)),
 ]   
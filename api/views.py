@@ -2,29 +2,48 @@ from .serializers import (AccountSerializer,
                           AccountMemberSerializer,
                           DestinationSerializer,
                           LogSerializer,
-                          IncomingDataSerializer)
+                          IncomingDataSerializer,
+                          IncomingEventSerializer,
+                          resolve_account)
 from rest_framework import (
                             viewsets,
                             status)
-from .models import Account,AccountMember,Destination,Log
+from .models import Account,AccountMember,DeliveryStat,Destination,Log
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from drf_spectacular.utils import extend_schema,OpenApiResponse
+from drf_spectacular.types import OpenApiTypes
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import is_aware, make_aware
+from rest_framework.utils.urls import replace_query_param
+from itertools import islice
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
 from rest_framework.decorators import action, api_view
-from django.core.cache import cache
-from django.utils.http import urlencode
 from django.core.exceptions import PermissionDenied
 from .tasks import send_data_to_destinations
+from .ingest import claim_event_ids, enqueue_events, release_event_ids
+from .pagination import KeysetPagination, OptionalPageNumberPagination
+from .export import CONTENT_TYPES, EXPORTERS
+from .archive import ArchiveFallthroughMixin, decode_cursor, encode_cursor, log_archive
+from .parsers import FastJSONParser, NDJSONParser
+from .renderers import FastJSONRenderer
+from django.conf import settings
 from rest_framework import generics
 from django.shortcuts import get_object_or_404
 from rest_framework.throttling import UserRateThrottle
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.renderers import BrowsableAPIRenderer
 from .throttling import AuthenticatedUserThrottle
+from .circuit import CircuitBreaker
+from .response_cache import CachedListMixin
+from .fieldsets import SparseFieldsetMixin
+from .fast_read import FastListMixin
+from .access import NORMAL_USER_ROLE_ID, get_access_scope
+from .stats import stats_series, stats_summary, stats_window
 
-CACHE_KEYS = "accounts_list_keys"
-
-class AccountViewset(viewsets.ModelViewSet):
+class AccountViewset(CachedListMixin, FastListMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     serializer_class = AccountSerializer
     permission_classes = [IsAuthenticated]
     queryset = queryset = Account.objects.select_related("created_by", "updated_by").all()
@@ -35,63 +54,63 @@ class AccountViewset(viewsets.ModelViewSet):
     ordering_fields = ['created_at', 'updated_at']
     ordering = ['created_at']
     throttle_classes = [AuthenticatedUserThrottle] 
+    response_cache_prefix = "accounts_list"
+    pagination_class = OptionalPageNumberPagination
 
     def get_queryset(self):
-        user = self.request.user
+        access = get_access_scope(self.request)
         query_params = self.request.GET.dict()  
-        cache_key = f"accounts_list_{user.id}_{urlencode(query_params)}"  
-
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            return cached_data  
-        
-        is_admin = AccountMember.objects.filter(user=user, role__role_name="Admin").exists()
-        if is_admin or user.is_superuser:
+        if access.sees_all_accounts:
             queryset = Account.objects.select_related("created_by", "updated_by").all()
         else:
-            account_ids = AccountMember.objects.filter(user=user).values_list("account_id", flat=True)
-            queryset = Account.objects.filter(id__in=account_ids)
+            queryset = Account.objects.filter(id__in=access.account_ids)
         valid_fields = {field.name for field in Account._meta.fields}  
         filters = {key: value for key, value in query_params.items() if key in valid_fields}
         queryset = queryset.filter(**filters)
         if not queryset.exists():
             raise PermissionDenied("No accounts Found!")
-        keys = cache.get(CACHE_KEYS, set())
-        keys.add(cache_key)
-        cache.set(CACHE_KEYS, keys, timeout=300) 
-        cache.set(cache_key, queryset, timeout=300)
         return queryset
     
     @extend_schema(
             description='Create a new Account. Only superusers can create Account.'
             )
     def create(self, request, *args, **kwargs):
-        user = request.user
-        is_admin = AccountMember.objects.filter(user=user, role__role_name="Admin").exists()
-        if not user.is_superuser and not is_admin:
+        if not get_access_scope(request).sees_all_accounts:
             return Response({"detail" : "You don't have access to create an account !" },status= status.HTTP_403_FORBIDDEN)
         return super().create(request, *args, **kwargs)
     
     def update(self, request, *args, **kwargs):
-        user = request.user
+        access = get_access_scope(request)
         account = self.get_object()
-        if not user.is_superuser:
-            is_admin = AccountMember.objects.filter(user=user, role__role_name="Admin").exists()
-            if not is_admin:
-                acc_member = AccountMember.objects.filter(user=user, account=account)
-                if not acc_member.exists():
-                    return Response({"detail" : "You don't have access to update this account !" },status= status.HTTP_403_FORBIDDEN)
+        if not access.sees_all_accounts and not access.is_member(account.id):
+            return Response({"detail" : "You don't have access to update this account !" },status= status.HTTP_403_FORBIDDEN)
         return super().update(request, *args, **kwargs)
 
     def destroy(self, request, *args, **kwargs):
-        user = request.user
-        is_admin = AccountMember.objects.filter(user=user, role__role_name="Admin").exists()
-        if not user.is_superuser and not is_admin:
+        if not get_access_scope(request).sees_all_accounts:
             return Response({"detail" : "You don't have access to delete an account !" },status= status.HTTP_403_FORBIDDEN)
         return super().destroy(request, *args, **kwargs)
+
+    @extend_schema(
+        description="Delivery counts, success rate and p50/p95 latency of the account, "
+                    "overall and per destination. Accepts since and until (ISO 8601, default "
+                    "the last 24 hours).",
+    )
+    @action(detail=True, methods=["get"])
+    def stats(self, request, account_id=None):
+        account = self.get_object()
+        _, since, until = stats_window(request.query_params.dict() | {"granularity": "hour"})
+        rows = DeliveryStat.objects.filter(account=account, granularity="hour",
+                                           bucket__gte=since, bucket__lt=until)
+        return Response({
+            "account": account.id,
+            "since": since,
+            "until": until,
+            "summary": stats_summary(rows, group_by="destination_id"),
+        })
     
 
-class AccountMemberViewset(viewsets.ModelViewSet):
+class AccountMemberViewset(CachedListMixin, FastListMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     serializer_class = AccountMemberSerializer
     permission_classes = [IsAuthenticated]
     queryset = queryset = AccountMember.objects.select_related("created_by", "updated_by").all()
@@ -101,68 +120,49 @@ class AccountMemberViewset(viewsets.ModelViewSet):
     ordering_fields = ['created_at', 'updated_at']
     ordering = ['created_at']
     throttle_classes = [AuthenticatedUserThrottle] 
-    
+    response_cache_prefix = "accounts_member"
+    pagination_class = OptionalPageNumberPagination
 
     def get_queryset(self):
-        user = self.request.user
+        access = get_access_scope(self.request)
         query_params = self.request.GET.dict()  
-        cache_key = f"accounts_member_{user.id}_{urlencode(query_params)}"  
-        is_admin = AccountMember.objects.filter(user=user, role__role_name="Admin").exists()
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            return cached_data  
-
-        if is_admin or user.is_superuser:
-            queryset = AccountMember.objects.select_related("created_by", "user", "updated_by").all()
-        else:
-            user_accounts = AccountMember.objects.filter(user=user).values_list('account_id', flat=True)
-            queryset = AccountMember.objects.select_related("created_by", "user", "updated_by").filter(account_id__in=user_accounts)
+        queryset = access.scope(AccountMember.objects.select_related("created_by", "user", "updated_by").all())
         valid_fields = {field.name for field in AccountMember._meta.fields}  
         filters = {key: value for key, value in query_params.items() if key in valid_fields}
         queryset = queryset.filter(**filters)
         if not queryset.exists():
             raise PermissionDenied("No accounts Found!")
-        keys = cache.get(CACHE_KEYS, set())
-        keys.add(cache_key)
-        cache.set(CACHE_KEYS, keys, timeout=300) 
-        cache.set(cache_key, queryset, timeout=300)
         return queryset
     
     @extend_schema(
             description="""Create Account Member. Only Admin can create Account Members. Give Role as 1 for Admin account and 2 for Normal User account"""
             )
     def create(self, request, *args, **kwargs):
-        if not request.user.is_superuser:
-            is_admin = AccountMember.objects.filter(user=request.user, role__id=1).exists()
-            if not is_admin:
-                return Response(
-                    {"detail": "You don't have access to create an account!"},
-                    status=status.HTTP_403_FORBIDDEN
-                )
+        if not get_access_scope(request).sees_all_accounts:
+            return Response(
+                {"detail": "You don't have access to create an account!"},
+                status=status.HTTP_403_FORBIDDEN
+            )
         return super().create(request, *args, **kwargs)
     
     def update(self, request, *args, **kwargs):
-        if not request.user.is_superuser:
-            is_admin = AccountMember.objects.filter(user=request.user, role__id=1).exists()
-            if not is_admin:
-                return Response(
-                    {"detail": "You don't have access to update an account!"},
-                    status=status.HTTP_403_FORBIDDEN
-                )
+        if not get_access_scope(request).sees_all_accounts:
+            return Response(
+                {"detail": "You don't have access to update an account!"},
+                status=status.HTTP_403_FORBIDDEN
+            )
         return super().update(request, *args, **kwargs)
     
     def destroy(self, request, *args, **kwargs):
-        if not request.user.is_superuser:
-            is_admin = AccountMember.objects.filter(user=request.user, role__id=1).exists()
-            if not is_admin:
-                return Response(
-                    {"detail": "You don't have access to delete an account!"},
-                    status=status.HTTP_403_FORBIDDEN
-                )
+        if not get_access_scope(request).sees_all_accounts:
+            return Response(
+                {"detail": "You don't have access to delete an account!"},
+                status=status.HTTP_403_FORBIDDEN
+            )
         return super().destroy(request, *args, **kwargs)
     
 
-class DestinationViewSet(viewsets.ModelViewSet):
+class DestinationViewSet(CachedListMixin, FastListMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     serializer_class = DestinationSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -171,73 +171,143 @@ class DestinationViewSet(viewsets.ModelViewSet):
     ordering_fields = ["created_at", "updated_at"]
     ordering = ["-created_at"]
     throttle_classes = [AuthenticatedUserThrottle] 
+    response_cache_prefix = "destinations"
+    pagination_class = OptionalPageNumberPagination
 
     def get_queryset(self):
-        user = self.request.user
-        cache_key = f"destinations_{user.id}_{urlencode(self.request.GET)}"
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            return cached_data
-
-        if AccountMember.objects.filter(user=user, role_id=1).exists() or user.is_superuser:
-            queryset = Destination.objects.all()
-        else:
-            user_accounts = AccountMember.objects.filter(user=user).values_list("account_id", flat=True)
-            queryset = Destination.objects.filter(account_id__in=user_accounts)
-        cache.set(cache_key, queryset, timeout=300) 
-        return queryset
+        return get_access_scope(self.request).scope(Destination.objects.all())
     
     def create(self, request, *args, **kwargs):
-        user = request.user
-        if not AccountMember.objects.filter(user=user, role_id=1).exists() and user.is_superuser:
+        access = get_access_scope(request)
+        if not (access.is_admin or access.is_superuser):
             return Response({"detail": "You don't have permission to create a destination!"}, status=status.HTTP_403_FORBIDDEN)
         return super().create(request, *args, **kwargs)
 
     def update(self, request, *args, **kwargs):
-        user = request.user
+        access = get_access_scope(request)
         destination = get_object_or_404(Destination, pk=kwargs["pk"])
-        if not AccountMember.objects.filter(user=user, account=destination.account, role_id=2).exists() and not user.is_superuser:
+        if not access.has_role(destination.account_id, NORMAL_USER_ROLE_ID) and not access.is_superuser:
             return Response({"detail": "You can only update destinations linked to your account!"}, status=status.HTTP_403_FORBIDDEN)
 
         return super().update(request, *args, **kwargs)
 
     def destroy(self, request, *args, **kwargs):
-        user = request.user
-        if not AccountMember.objects.filter(user=user, role_id=1).exists() and not user.is_superuser:
+        if not get_access_scope(request).sees_all_accounts:
             return Response({"detail": "You don't have permission to delete a destination!"}, status=status.HTTP_403_FORBIDDEN)
 
         return super().destroy(request, *args, **kwargs)
+
+    @extend_schema(
+        description="Circuit breaker state of the destination: closed, open or half_open, "
+                    "with the calls and failures counted in the current window."
+    )
+    @action(detail=True, methods=["get"])
+    def circuit(self, request, pk=None):
+        destination = self.get_object()
+        return Response(CircuitBreaker(destination.id).snapshot())
+
+    @extend_schema(
+        description="Delivery counts, success rate and p50/p95 latency of the destination, "
+                    "overall and per bucket. ?granularity=minute|hour (default hour), "
+                    "since and until (ISO 8601, default the last 24 hours).",
+    )
+    @action(detail=True, methods=["get"])
+    def stats(self, request, pk=None):
+        destination = self.get_object()
+        granularity, since, until = stats_window(request.query_params)
+        rows = DeliveryStat.objects.filter(destination=destination, granularity=granularity,
+                                           bucket__gte=since, bucket__lt=until)
+        return Response({
+            "destination": destination.id,
+            "granularity": granularity,
+            "since": since,
+            "until": until,
+            "summary": stats_summary(rows),
+            "buckets": stats_series(rows),
+        })
     
-class LogViewSet(viewsets.ReadOnlyModelViewSet):
+class LogViewSet(CachedListMixin, ArchiveFallthroughMixin, FastListMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = LogSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ["account", "destination", "status", "received_timestamp", "processed_timestamp"]
-    search_fields = ["event_id"]
+    search_fields = ["event__event_id"]
     ordering_fields = ["received_timestamp", "processed_timestamp"]
     ordering = ["-received_timestamp"]
+    keyset_fields = ["received_timestamp", "processed_timestamp"]
+    pagination_class = KeysetPagination
     throttle_classes = [AuthenticatedUserThrottle] 
+    response_cache_prefix = "logs"
+    # Logs are bulk inserted without signals, so their pages only live briefly.
+    response_cache_timeout_setting = "LOG_RESPONSE_CACHE_TIMEOUT"
 
     def get_queryset(self):
-        user = self.request.user
-        cache_key = f"logs_{user.id}_{urlencode(self.request.GET)}"
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            return cached_data
+        access = get_access_scope(self.request)
+        queryset = Log.objects.select_related("event").all()
+        if access.is_admin:
+            return queryset
+        return queryset.filter(account_id__in=access.account_ids)
 
-        is_admin = AccountMember.objects.filter(user=user, role_id=1).exists()
-        if is_admin:
-            queryset = Log.objects.all()
-        else:
-            user_accounts = AccountMember.objects.filter(user=user).values_list("account_id", flat=True)
-            queryset = Log.objects.filter(account_id__in=user_accounts)
-        cache.set(cache_key, queryset, timeout=300) 
-        return queryset
+    @extend_schema(
+        description="Stream every log matching the list filters as NDJSON (default) or CSV. "
+                    "Choose with ?output=ndjson or ?output=csv; the export is not paginated. "
+                    "Archived logs follow the database rows, as in the list.",
+        responses={(200, "application/x-ndjson"): OpenApiTypes.STR, (200, "text/csv"): OpenApiTypes.STR},
+    )
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        output = request.query_params.get("output", "ndjson")
+        if output not in EXPORTERS:
+            return Response({"detail": f"Unsupported output '{output}'. Use ndjson or csv."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(EXPORTERS[output](queryset, self.get_archived_rows() or ()),
+                                         content_type=CONTENT_TYPES[output])
+        response["Content-Disposition"] = f'attachment; filename="logs.{output}"'
+        return response
+
+    @extend_schema(
+        description="Logs of one account that were moved to the archive, oldest first. "
+                    "Requires ?account=<id>; accepts since, until (ISO 8601), event_id, "
+                    "destination, status and page_size. Follow `next` for more.",
+    )
+    @action(detail=False, methods=["get"])
+    def archived(self, request):
+        params = request.query_params
+        access = get_access_scope(request)
+        account_id = params.get("account", "")
+        if not account_id.isdigit():
+            return Response({"detail": "The account parameter is required."}, status=status.HTTP_400_BAD_REQUEST)
+        if not access.is_admin and not access.is_member(account_id):
+            return Response({"detail": "You don't have access to this account's logs!"},
+                            status=status.HTTP_403_FORBIDDEN)
+        try:
+            bounds = {name: parse_datetime(params[name]) for name in ["since", "until"] if params.get(name)}
+            after = decode_cursor(params["cursor"]) if params.get("cursor") else None
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if None in bounds.values():
+            return Response({"detail": "since and until must be ISO 8601 timestamps."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        bounds = {name: value if is_aware(value) else make_aware(value) for name, value in bounds.items()}
+        filters = {name: params[name] for name in ["destination", "status"] if params.get(name)}
+
+        page_size = KeysetPagination().get_page_size(request)
+        rows = log_archive.iter_rows(int(account_id), event_id=params.get("event_id"), after=after,
+                                     **bounds, **filters)
+        results = list(islice(rows, page_size + 1))
+        next_link = None
+        if len(results) > page_size:
+            results = results[:page_size]
+            next_link = replace_query_param(request.build_absolute_uri(), "cursor", encode_cursor(results[-1]))
+        return Response({"next": next_link, "results": results})
 
 class IncomingDataHandlerViewSet(viewsets.ViewSet):
     """Handles incoming data processing with caching and rate limiting."""
 
     throttle_classes = [UserRateThrottle] 
+    parser_classes = [FastJSONParser, FormParser, MultiPartParser]
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
 
     @extend_schema(
         request=IncomingDataSerializer,  # Define the request schema
@@ -259,9 +329,114 @@ class IncomingDataHandlerViewSet(viewsets.ViewSet):
         account = serializer.validated_data["account"]
         event_id = serializer.validated_data["event_id"]
         data = serializer.validated_data["data"]
-        cache_key = f"incoming_data_{account.id}_{event_id}"
-        if cache.get(cache_key):
+        if not claim_event_ids(account.id, [event_id])[0]:
             return Response({"success": False, "message": "Duplicate Event ID"}, status=status.HTTP_400_BAD_REQUEST)
-        cache.set(cache_key, True, timeout=60)
-        send_data_to_destinations.delay(account.id, event_id, data)
-        return Response({"success": True, "message": "Data Received"}, status=status.HTTP_202_ACCEPTED)
\ No newline at end of file
+        try:
+            send_data_to_destinations.delay(account.id, event_id, data)
+        except Exception:
+            release_event_ids(account.id, [event_id])
+            raise
+        return Response({"success": True, "message": "Data Received"}, status=status.HTTP_202_ACCEPTED)
+
+    @extend_schema(
+        request=IncomingEventSerializer(many=True),
+        responses={
+            status.HTTP_202_ACCEPTED: OpenApiResponse(
+                description="Per-item results, in request order",
+                response={"application/json": {"example": {"success": True, "results": [
+                    {"index": 0, "event_id": "evt-1", "status": "accepted"},
+                    {"index": 1, "event_id": "evt-1", "status": "duplicate"},
+                    {"index": 2, "event_id": None, "status": "invalid", "errors": {"event_id": ["This field is required."]}},
+                ]}}}
+            ),
+            status.HTTP_400_BAD_REQUEST: OpenApiResponse(
+                description="Unauthenticated or malformed batch",
+                response={"application/json": {"example": {"success": False, "message": "Invalid Data"}}}
+            ),
+        },
+    )
+    @action(detail=False, methods=["post"])
+    def incoming_data_batch(self, request):
+        """Accept a JSON array of ``{event_id, data}`` items in one request."""
+        account = resolve_account(request.headers.get("CL-X-TOKEN"))
+        items = request.data
+        max_size = getattr(settings, "INGEST_BATCH_MAX_SIZE", 1000)
+        if not isinstance(items, list) or not items:
+            return Response({"success": False, "message": "Invalid Data"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > max_size:
+            return Response({"success": False, "message": f"Batch exceeds {max_size} events"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        results = []
+        valid = []
+        for index, item in enumerate(items):
+            item_serializer = IncomingEventSerializer(data=item)
+            if item_serializer.is_valid():
+                valid.append((index, item_serializer.validated_data))
+                results.append(None)
+            else:
+                event_id = item.get("event_id") if isinstance(item, dict) else None
+                results.append({"index": index, "event_id": event_id,
+                                "status": "invalid", "errors": item_serializer.errors})
+
+        claimed = claim_event_ids(account.id, [item["event_id"] for _, item in valid])
+        accepted = []
+        for (index, item), is_new in zip(valid, claimed):
+            results[index] = {"index": index, "event_id": item["event_id"],
+                              "status": "accepted" if is_new else "duplicate"}
+            if is_new:
+                accepted.append((item["event_id"], item["data"]))
+        enqueue_events(account.id, accepted)
+        return Response({"success": True, "results": results}, status=status.HTTP_202_ACCEPTED)
+
+    @extend_schema(
+        request={"application/x-ndjson": {"type": "string", "example": '{"event_id": "evt-1", "data": {}}'}},
+        responses={
+            status.HTTP_202_ACCEPTED: OpenApiResponse(
+                description="Counts per outcome and the first invalid lines",
+                response={"application/json": {"example": {"success": True, "accepted": 2, "duplicate": 1, "invalid": 1,
+                                                           "errors": [{"line": 4, "errors": "JSON parse error"}]}}}
+            ),
+        },
+    )
+    @action(detail=False, methods=["post"], parser_classes=[NDJSONParser])
+    def incoming_data_stream(self, request):
+        """
+        Accept newline-delimited ``{event_id, data}`` objects. Lines are
+        parsed as the body streams in and handled in chunks, so the size
+        of the upload does not bound the memory of the worker.
+        """
+        account = resolve_account(request.headers.get("CL-X-TOKEN"))
+        chunk_size = getattr(settings, "INGEST_ENQUEUE_CHUNK_SIZE", 100)
+        max_errors = getattr(settings, "INGEST_NDJSON_MAX_ERRORS", 100)
+        counts = {"accepted": 0, "duplicate": 0, "invalid": 0}
+        errors = []
+
+        def reject(line_number, detail):
+            counts["invalid"] += 1
+            if len(errors) < max_errors:
+                errors.append({"line": line_number, "errors": detail})
+
+        def flush(chunk):
+            claimed = claim_event_ids(account.id, [event_id for event_id, _ in chunk])
+            accepted = [event for event, is_new in zip(chunk, claimed) if is_new]
+            counts["accepted"] += len(accepted)
+            counts["duplicate"] += len(chunk) - len(accepted)
+            enqueue_events(account.id, accepted)
+
+        chunk = []
+        for line_number, item, error in request.data:
+            if error:
+                reject(line_number, error)
+                continue
+            item_serializer = IncomingEventSerializer(data=item)
+            if not item_serializer.is_valid():
+                reject(line_number, item_serializer.errors)
+                continue
+            chunk.append((item_serializer.validated_data["event_id"], item_serializer.validated_data["data"]))
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                chunk = []
+        if chunk:
+            flush(chunk)
+        return Response({"success": True, **counts, "errors": errors}, status=status.HTTP_202_ACCEPTED)